@@ -0,0 +1,189 @@
+import os
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
+from dotenv import load_dotenv
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Extensiones soportadas para el documento de negocio, en orden de preferencia
+SUPPORTED_EXTENSIONS = (".txt", ".docx", ".pdf")
+
+
+class AttachmentTooLargeError(Exception):
+    pass
+
+
+def decode_text(data: bytes) -> str:
+    '''
+    Decodifica un archivo de texto detectando su codificación, en lugar de asumir UTF-8.
+    '''
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        pass
+
+    # charset_normalizer viene con requests; si no está, se usa latin-1 (nunca falla)
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(data).best()
+        if best is not None:
+            return str(best)
+    except ImportError:
+        pass
+
+    return data.decode("latin-1")
+
+
+def extract_docx_text(data: bytes) -> str:
+    '''
+    Extrae el texto de un documento Word (requiere python-docx)
+    '''
+    import docx
+    document = docx.Document(io.BytesIO(data))
+    return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def extract_pdf_text(data: bytes) -> str:
+    '''
+    Extrae el texto de un PDF (requiere pypdf)
+    '''
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(data))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+class AttachmentResolver:
+    '''
+    Resuelve y descarga el documento de negocio adjunto a una épica.
+
+    Busca el adjunto <ÉPICA>.txt (o .docx/.pdf) con un índice por nombre, lo descarga en
+    bloques con un tamaño máximo y detecta la codificación. La extracción de texto de docx
+    y pdf se hace en un pool de procesos, con un tiempo máximo, para no detener la lectura
+    de épicas con archivos grandes.
+    '''
+
+    def __init__(self, jira):
+        self.jira = jira
+        self.max_bytes = int(os.getenv("ATTACHMENT_MAX_BYTES", str(5 * 1024 * 1024)))
+        self.chunk_size = int(os.getenv("ATTACHMENT_CHUNK_SIZE", str(64 * 1024)))
+        self.extract_workers = int(os.getenv("ATTACHMENT_EXTRACT_WORKERS", "2"))
+        self.extract_timeout = float(os.getenv("ATTACHMENT_EXTRACT_TIMEOUT_SECONDS", "60"))
+        self._pool = None
+
+
+    def find_attachment(self, epic_key: str, attachments):
+        '''
+        Método que encuentra el adjunto del documento de negocio de la épica.
+
+        Primero busca por nombre exacto (<ÉPICA>.txt, .docx, .pdf, en ese orden) en un índice;
+        si no está, acepta un adjunto cuyo nombre contenga <ÉPICA>.txt, como antes.
+        '''
+        index = {attachment.filename.lower(): attachment for attachment in attachments or []}
+
+        for extension in SUPPORTED_EXTENSIONS:
+            attachment = index.get(f"{epic_key}{extension}".lower())
+            if attachment is not None:
+                return attachment
+
+        filename = f"{epic_key}.txt".lower()
+        return next((a for name, a in index.items() if filename in name), None)
+
+
+    def download(self, attachment) -> bytes:
+        '''
+        Método que descarga el contenido del adjunto en bloques, sin superar el tamaño máximo
+        '''
+        size = getattr(attachment, "size", None)
+        if size is not None and size > self.max_bytes:
+            raise AttachmentTooLargeError(f"{attachment.filename} pesa {size} bytes (máximo {self.max_bytes})")
+
+        buffer = bytearray()
+        with self.jira._session.get(attachment.content, stream=True) as response:
+            response.raise_for_status()
+
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                buffer.extend(chunk)
+                if len(buffer) > self.max_bytes:
+                    raise AttachmentTooLargeError(f"{attachment.filename} supera el máximo de {self.max_bytes} bytes")
+
+        return bytes(buffer)
+
+
+    def extract_text(self, filename: str, data: bytes) -> str:
+        '''
+        Método que obtiene el texto del archivo según su extensión
+        '''
+        name = filename.lower()
+
+        if name.endswith(".docx"):
+            return self._extract_in_pool(extract_docx_text, data)
+        if name.endswith(".pdf"):
+            return self._extract_in_pool(extract_pdf_text, data)
+
+        return decode_text(data)
+
+
+    def _extract_in_pool(self, function, data: bytes) -> str:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.extract_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+        future = self._pool.submit(function, data)
+        try:
+            return future.result(timeout=self.extract_timeout)
+        except FutureTimeoutError:
+            # El proceso sigue trabajando en el archivo: se descarta el pool para no esperarlo
+            logger.warning("La extracción de texto superó %s segundos. Reiniciando el pool de extracción", self.extract_timeout)
+            self._discard_pool()
+            raise
+
+
+    def _discard_pool(self) -> None:
+        '''
+        Método que descarta el pool de extracción terminando sus procesos, sin esperar las
+        tareas en curso. Se vuelve a crear al siguiente uso.
+        '''
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+
+        # ProcessPoolExecutor no expone sus procesos antes de Python 3.14
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        if hasattr(pool, "terminate_workers"):
+            pool.terminate_workers()
+        else:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+
+    def resolve(self, epic_key: str, attachments) -> Optional[str]:
+        '''
+        Método que entrega el texto del documento de negocio de la épica, o None si no existe
+        '''
+        attachment = self.find_attachment(epic_key, attachments)
+        if attachment is None:
+            return None
+
+        data = self.download(attachment)
+        text = self.extract_text(attachment.filename, data)
+        logger.debug("Detalles de la iniciativa de negocios encontrados en %s (%s)", epic_key, attachment.filename)
+        return text
+
+
+    def close(self) -> None:
+        '''
+        Método que cierra el pool de extracción, si fue creado
+        '''
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,11 +1,27 @@
 from dotenv import load_dotenv
+from collections import OrderedDict
 import os
+import threading
+import time
+from typing import Optional
+from log_config import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 class BusinessInfo:
-    # Colección que guarda los contextos de negocio ya leídos
-    _business_info_files: dict = {}
+    # Colección que guarda los contextos de negocio ya leídos. Es un LRU acotado por bytes:
+    # al superar el máximo se descartan los documentos usados hace más tiempo
+    _business_info_files: OrderedDict = OrderedDict()
+    _cache_bytes: int = 0
+
+    # Fallas de lectura (archivo no encontrado, errores de Jira), con su hora de expiración.
+    # Se guardan aparte y por poco tiempo, para no tratarlas como documentos reales
+    _failures: dict = {}
+
+    _stats: dict = {"hits": 0, "misses": 0, "negative_hits": 0, "evictions": 0}
+    _lock = threading.RLock()
     _info_folder: str
 
     def __new__(cls):
@@ -16,8 +32,65 @@ class BusinessInfo:
     
     def _init_business_info(self):
         self._info_folder = os.getenv("BUSINESS_INFO_FOLDER", "sources")
+        self._max_bytes = int(os.getenv("BUSINESS_INFO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self._negative_ttl = float(os.getenv("BUSINESS_INFO_NEGATIVE_TTL_SECONDS", "60"))
+
+        logger.info("Información del negocio para obtener desde: %s", self._info_folder)
+
+
+    def _filename(self, epic_key: str) -> str:
+        # Nombre del archivo, validar si es txt
+        filename = epic_key
+        if not filename.endswith(".txt"):
+            filename += ".txt"
+        return filename
+
+
+    def _store(self, filename: str, content: str) -> None:
+        '''
+        Guarda un documento en el LRU, descartando los menos usados si se supera el máximo de bytes
+        '''
+        size = len(content.encode("utf-8")) if content else 0
+
+        with self._lock:
+            # Reemplazar una versión anterior, si existía
+            previous = self._business_info_files.pop(filename, None)
+            if previous is not None:
+                BusinessInfo._cache_bytes -= previous[1]
 
-        print(f"Información del negocio para obtener desde: {self._info_folder}")
+            self._failures.pop(filename, None)
+            self._business_info_files[filename] = (content, size)
+            BusinessInfo._cache_bytes += size
+
+            # Descartar los documentos usados hace más tiempo (nunca el recién agregado)
+            while BusinessInfo._cache_bytes > self._max_bytes and len(self._business_info_files) > 1:
+                _, (_, evicted_size) = self._business_info_files.popitem(last=False)
+                BusinessInfo._cache_bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+
+    def _lookup(self, filename: str):
+        '''
+        Busca un documento (o una falla vigente). Retorna (encontrado, contenido) y actualiza
+        los contadores y el orden del LRU.
+        '''
+        with self._lock:
+            entry = self._business_info_files.get(filename)
+            if entry is not None:
+                self._business_info_files.move_to_end(filename)
+                self._stats["hits"] += 1
+                return True, entry[0]
+
+            failure = self._failures.get(filename)
+            if failure is not None:
+                message, expires_at = failure
+                if time.monotonic() < expires_at:
+                    self._stats["negative_hits"] += 1
+                    return True, message
+                del self._failures[filename]
+
+            self._stats["misses"] += 1
+            return False, None
 
 
     def get_business_info(self, filename: str) -> str:
@@ -27,70 +100,108 @@ class BusinessInfo:
         '''
 
         # Agregar extensión TXT al archivo
-        if not filename.endswith(".txt"):
-            filename += ".txt"
+        filename = self._filename(filename)
 
-        # Si el archivo no está codificado dentro de la colección de contextos
+        # Si el archivo ya está en la colección de contextos, retornarlo
         # (la colección es un par ordenado con nombre de archivo como clave y contenido
         # de archivo como valor)
-        if filename not in self._business_info_files:
+        found, content = self._lookup(filename)
+        if found:
+            return content
 
-            # Obtener la ruta hacia el archivo
-            file_path = os.path.join(self._info_folder, filename)
+        # Obtener la ruta hacia el archivo
+        file_path = os.path.join(self._info_folder, filename)
 
-            try:
-                # Leer el archivo
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+        try:
+            # Leer el archivo
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
 
-                    # Agregar a la colección de contextos de la clase
-                    self._business_info_files[filename] = content
-                    print(f"Información del negocio cargada desde {file_path}")
-            
-            except FileNotFoundError:
-                print(f"Archivo no encontrado: {file_path}")
-                self._business_info_files[filename] = ""
+            # Agregar a la colección de contextos de la clase
+            self._store(filename, content)
+            logger.debug("Información del negocio cargada desde %s", file_path)
+        
+        except FileNotFoundError:
+            logger.warning("Archivo no encontrado: %s", file_path)
+            content = ""
+            self.add_epic_failure(filename, content)
         
-        return self._business_info_files[filename]
+        return content
     
 
     def epic_already_read(self, epic_key: str) -> bool:
         '''
-        Valida si ya fue leída la información de la épica.
+        Valida si ya fue leída la información de la épica (o si falló hace poco).
         '''
-        
-        # Nombre del archivo, validar si es txt
-        filename = epic_key
-        if not filename.endswith(".txt"):
-            filename += ".txt"
+        filename = self._filename(epic_key)
 
-        # Retorna verdadero si el archivo ya estaba cargado
-        return filename in self._business_info_files
+        # Retorna verdadero si el archivo ya estaba cargado o si hay una falla vigente
+        with self._lock:
+            if filename in self._business_info_files:
+                return True
+
+            failure = self._failures.get(filename)
+            return failure is not None and time.monotonic() < failure[1]
     
 
     def add_epic_to_list(self, epic_key: str, content: str):
 
         # Usar la clave de épica como nombre de archivo y validar que
         # tiene extensión TXT
-        filename = epic_key
-        if not filename.endswith(".txt"):
-            filename += ".txt"
+        filename = self._filename(epic_key)
 
         # Agregar a la colección con par (llave, valor),
         # donde llave = filename y valor = content
-        self._business_info_files[filename] = content
+        self._store(filename, content)
 
-    def get_epic_from_list(self, epic_key:str) -> str:
+
+    def add_epic_failure(self, epic_key: str, message: str):
+        '''
+        Registra una falla al leer la información de la épica. El mensaje se entrega en lugar
+        del documento sólo hasta que vence el TTL; después se vuelve a intentar la lectura.
+        '''
+        filename = self._filename(epic_key)
+
+        with self._lock:
+            self._failures[filename] = (message, time.monotonic() + self._negative_ttl)
+
+
+    def get_epic(self, epic_key: str) -> Optional[str]:
+        '''
+        Entrega la información de la épica (o el mensaje de una falla vigente), o None si no
+        está en el caché. Buscar y leer es una sola operación, así que el TTL o el LRU no
+        pueden descartar la entrada entre una y otra.
+        '''
 
         # Usar la clave de épica como nombre de archivo y validar que
         # tiene extensión TXT
-        filename = epic_key
-        if not filename.endswith(".txt"):
-            filename += ".txt"
+        found, content = self._lookup(self._filename(epic_key))
+        return content if found else None
 
-        # Agregar a la colección con par (llave, valor),
-        # donde llave = filename y valor = content
-        return self._business_info_files[filename]
+
+    def get_epic_from_list(self, epic_key:str) -> str:
+
+        # Buscar en la colección (o en las fallas vigentes)
+        content = self.get_epic(epic_key)
+        if content is None:
+            raise KeyError(self._filename(epic_key))
+
+        return content
+
+
+    def get_cache_stats(self) -> dict:
+        '''
+        Entrega los contadores del caché (aciertos, fallos, aciertos de fallas y descartes),
+        junto con la cantidad de documentos y bytes en uso, para monitoreo.
+        '''
+        with self._lock:
+            return {
+                **self._stats,
+                "documents": len(self._business_info_files),
+                "bytes": BusinessInfo._cache_bytes,
+                "max_bytes": self._max_bytes,
+                "failures": len(self._failures)
+            }
             
         
     # Método en desuso
@@ -0,0 +1,143 @@
+import os
+import threading
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Niveles de impacto en el orden de su código entero (columna de la matriz de conteos)
+IMPACT_LEVELS = ["Nulo", "Bajo", "Medio", "Alto"]
+LEVEL_CODES = {level: code for code, level in enumerate(IMPACT_LEVELS)}
+
+# Fila con el total de todas las épicas
+TOTAL_KEY = "TOTAL"
+
+
+class ImpactRollup:
+    '''
+    Agregado de niveles de impacto por épica y métrica, calculado a medida que llegan las filas.
+
+    Cada épica tiene una matriz de conteos (métricas x niveles) de enteros. Al agregar un
+    issue, sus niveles se codifican como enteros y se suman a la matriz en una sola operación
+    vectorizada. El puntaje ponderado de cada métrica es el promedio de los pesos de sus
+    niveles (ROLLUP_LEVEL_WEIGHTS, en el orden Nulo, Bajo, Medio, Alto).
+    '''
+
+    def __init__(self, weights: List[float] = None):
+        if weights is None:
+            weights = [float(w) for w in os.getenv("ROLLUP_LEVEL_WEIGHTS", "0,1,2,3").split(",")]
+        if len(weights) != len(IMPACT_LEVELS):
+            raise ValueError(f"ROLLUP_LEVEL_WEIGHTS debe tener {len(IMPACT_LEVELS)} valores")
+
+        self.weights = np.asarray(weights, dtype=float)
+        self.metrics: Dict[str, int] = {}
+        self.counts: Dict[str, np.ndarray] = {}
+        self.issues: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+
+    def _metric_indexes(self, metrics: List[str]) -> np.ndarray:
+        # Las métricas nuevas agregan una fila a la matriz de todas las épicas
+        for metric in metrics:
+            if metric not in self.metrics:
+                self.metrics[metric] = len(self.metrics)
+
+        grow = len(self.metrics)
+        for epic_key, counts in self.counts.items():
+            if counts.shape[0] < grow:
+                self.counts[epic_key] = np.pad(counts, ((0, grow - counts.shape[0]), (0, 0)))
+
+        return np.fromiter((self.metrics[m] for m in metrics), dtype=np.intp, count=len(metrics))
+
+
+    def add(self, epic_key: str, impacts: dict) -> None:
+        '''
+        Método que suma los niveles de impacto de un issue ({'Métrica': 'Nivel'}) a su épica.
+        Los niveles desconocidos se ignoran.
+        '''
+        epic_key = epic_key or "sin-epica"
+        valid = {metric: level for metric, level in (impacts or {}).items() if level in LEVEL_CODES}
+
+        with self._lock:
+            rows = self._metric_indexes(list(valid))
+            columns = np.fromiter((LEVEL_CODES[level] for level in valid.values()), dtype=np.intp, count=len(valid))
+
+            counts = self.counts.get(epic_key)
+            if counts is None:
+                counts = np.zeros((len(self.metrics), len(IMPACT_LEVELS)), dtype=np.int64)
+                self.counts[epic_key] = counts
+
+            np.add.at(counts, (rows, columns), 1)
+            self.issues[epic_key] = self.issues.get(epic_key, 0) + 1
+
+
+    def add_counts(self, epic_key: str, metric: str, level_counts: List[int], issues: int = 0) -> None:
+        '''
+        Método que suma conteos ya agregados (por ejemplo, de un agregado parcial de otro proceso)
+        '''
+        with self._lock:
+            row = self._metric_indexes([metric])[0]
+            counts = self.counts.get(epic_key)
+            if counts is None:
+                counts = np.zeros((len(self.metrics), len(IMPACT_LEVELS)), dtype=np.int64)
+                self.counts[epic_key] = counts
+
+            counts[row] += np.asarray(level_counts, dtype=np.int64)
+            self.issues[epic_key] = max(self.issues.get(epic_key, 0), issues)
+
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Método que entrega el agregado como tabla: una fila por épica y métrica con los conteos
+        por nivel, el número de HUs de la épica y el puntaje ponderado, más filas TOTAL por métrica.
+        '''
+        columns = ["GOBI", "Métrica", "HUs"] + IMPACT_LEVELS[::-1] + ["Puntaje"]
+
+        with self._lock:
+            if not self.counts:
+                return pd.DataFrame(columns=columns)
+
+            metric_names = np.array(list(self.metrics), dtype=object)
+            epic_keys = list(self.counts)
+            width = len(self.metrics)
+
+            # Tensor épicas x métricas x niveles
+            tensor = np.stack([np.pad(self.counts[k], ((0, width - self.counts[k].shape[0]), (0, 0))) for k in epic_keys])
+            issues = np.array([self.issues.get(k, 0) for k in epic_keys], dtype=np.int64)
+
+        # Agregar el total de todas las épicas como una épica más
+        tensor = np.concatenate([tensor, tensor.sum(axis=0, keepdims=True)])
+        issues = np.append(issues, issues.sum())
+        epic_keys = epic_keys + [TOTAL_KEY]
+
+        totals = tensor.sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = np.where(totals > 0, (tensor @ self.weights) / totals, np.nan)
+
+        # Aplanar a una fila por (épica, métrica) con al menos un conteo
+        epic_index, metric_index = np.nonzero(totals)
+        frame = pd.DataFrame({
+            "GOBI": np.asarray(epic_keys, dtype=object)[epic_index],
+            "Métrica": metric_names[metric_index],
+            "HUs": issues[epic_index]
+        })
+        for code in range(len(IMPACT_LEVELS) - 1, -1, -1):
+            frame[IMPACT_LEVELS[code]] = tensor[epic_index, metric_index, code]
+        frame["Puntaje"] = scores[epic_index, metric_index].round(2)
+
+        return frame[columns]
+
+
+    def load_frame(self, frame: pd.DataFrame) -> None:
+        '''
+        Método que suma al agregado una tabla generada por to_frame (las filas TOTAL se omiten)
+        '''
+        for values in frame[frame["GOBI"] != TOTAL_KEY].to_dict("records"):
+            self.add_counts(
+                values["GOBI"],
+                values["Métrica"],
+                [int(values[level]) for level in IMPACT_LEVELS],
+                int(values["HUs"])
+            )
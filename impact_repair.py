@@ -0,0 +1,159 @@
+import json
+from typing import List, Tuple
+from langchain_core.runnables import Runnable
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field, ValidationError
+from jira_client import IssueAnalysis, MetricImpact
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class MetricImpactList(BaseModel):
+    impactos: List[MetricImpact] = Field(..., description="Impactos corregidos, uno por cada impacto recibido")
+
+
+# Prompt para la reparación. Sólo incluye los impactos inválidos, no el issue completo
+REPAIR_PROMPT_TEMPLATE = """
+    Los siguientes impactos de métricas no cumplen con el formato esperado.
+
+    Impactos inválidos (JSON):
+    {invalid_items}
+
+    Errores de validación:
+    {errors}
+
+    Corrige cada impacto manteniendo la métrica y el sentido de la justificación.
+    El campo "nivel" debe ser exactamente uno de: "Nulo", "Bajo", "Medio" o "Alto".
+    """
+
+
+class ImpactRepairRunnable(Runnable):
+    '''
+    Paso de la cadena que valida la salida estructurada del LLM y repara sólo los impactos inválidos.
+
+    Recibe la salida de with_structured_output(..., include_raw=True). Si el análisis es válido
+    se entrega tal cual. Si no, valida cada impacto por separado y hace un único intento de
+    reparación con el LLM sólo para los inválidos. Los que sigan siendo inválidos se descartan,
+    en lugar de perder el análisis completo.
+    '''
+
+    def __init__(self, structured_llm):
+        # structured_llm entrega MetricImpactList con la forma de with_structured_output(...,
+        # include_raw=True): el backend configurado o el router entre backends
+        prompt = ChatPromptTemplate.from_template(REPAIR_PROMPT_TEMPLATE)
+        self.repair_chain = prompt | structured_llm
+
+    def invoke(self, output, config=None):
+        analysis, args, invalid, errors = self._split(output)
+        if analysis is not None:
+            return analysis
+
+        repaired = []
+        if invalid:
+            try:
+                response = self.repair_chain.invoke(self._repair_input(invalid, errors), config)
+                repaired = self._repaired_impacts(response)
+            except Exception as e:
+                logger.warning("No fue posible reparar los impactos: %s", e)
+
+        return self._build(args, repaired, len(invalid))
+
+    async def ainvoke(self, output, config=None, **kwargs):
+        analysis, args, invalid, errors = self._split(output)
+        if analysis is not None:
+            return analysis
+
+        repaired = []
+        if invalid:
+            try:
+                response = await self.repair_chain.ainvoke(self._repair_input(invalid, errors), config)
+                repaired = self._repaired_impacts(response)
+            except Exception as e:
+                logger.warning("No fue posible reparar los impactos: %s", e)
+
+        return self._build(args, repaired, len(invalid))
+
+
+    def _split(self, output) -> Tuple:
+        '''
+        Separa la salida del LLM en análisis válido, o bien argumentos crudos con
+        impactos válidos e inválidos.
+        '''
+
+        # Salida ya validada (por ejemplo, sin include_raw)
+        if isinstance(output, IssueAnalysis):
+            return output, None, [], []
+
+        parsed = output.get("parsed")
+        if parsed is not None and output.get("parsing_error") is None:
+            return parsed, None, [], []
+
+        # Recuperar los argumentos crudos generados por el LLM
+        args = self._raw_arguments(output.get("raw"))
+        if args is None:
+            raise output.get("parsing_error") or ValueError("Respuesta del LLM sin contenido estructurado")
+
+        # Validar cada impacto por separado
+        valid, invalid, errors = [], [], []
+        for item in args.get("impactos") or []:
+            try:
+                valid.append(MetricImpact.model_validate(item))
+            except ValidationError as e:
+                invalid.append(item)
+                errors.append(str(e))
+
+        args["impactos"] = valid
+        return None, args, invalid, errors
+
+    def _raw_arguments(self, raw):
+        '''
+        Obtiene el diccionario de argumentos desde la respuesta cruda del LLM
+        (llamada a herramienta o contenido JSON).
+        '''
+        if raw is None:
+            return None
+        if isinstance(raw, dict):
+            return dict(raw)
+
+        tool_calls = getattr(raw, "tool_calls", None)
+        if tool_calls:
+            return dict(tool_calls[0].get("args", {}))
+
+        content = getattr(raw, "content", raw)
+        if isinstance(content, str):
+            try:
+                return json.loads(content)
+            except json.JSONDecodeError:
+                return None
+        return None
+
+    def _repaired_impacts(self, response) -> List[MetricImpact]:
+        '''
+        Obtiene los impactos reparados de la respuesta estructurada (con o sin include_raw)
+        '''
+        if isinstance(response, dict):
+            if response.get("parsing_error") is not None:
+                raise response["parsing_error"]
+            response = response.get("parsed")
+
+        return response.impactos if response else []
+
+    def _repair_input(self, invalid: list, errors: list) -> dict:
+        return {
+            "invalid_items": json.dumps(invalid, ensure_ascii=False, default=str),
+            "errors": "\n".join(errors)
+        }
+
+    def _build(self, args: dict, repaired: List[MetricImpact], invalid_count: int) -> IssueAnalysis:
+        '''
+        Construye el análisis final con los impactos válidos y los reparados.
+        Los errores en otros campos se propagan, igual que antes.
+        '''
+        args["impactos"] = args["impactos"] + list(repaired)
+
+        dropped = invalid_count - len(repaired)
+        if dropped > 0:
+            logger.warning("Se descartaron %s impactos inválidos para %s", dropped, args.get('issue_key'))
+
+        return IssueAnalysis.model_validate(args)
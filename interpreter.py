@@ -1,38 +1,72 @@
 import os
-from langgraph_setup import reactive_jql_app, JQLAnalysisState # Import your app and state
+import asyncio
+import argparse
+from langgraph_setup import reactive_jql_app, JQLAnalysisState, create_initial_state, astream_jql_events # Import your app and state
 from jira_client import JiraClient
 
 def main():
 
-    test_tools()
-#     # 1. Define the user query
-#     initial_prompt = "find all the issues of type 'Historia' in project 'Equipo SVA' that have been solved this month"
-
-#     # 2. Define the initial state
-#     initial_state: JQLAnalysisState = {
-#         "user_prompt": initial_prompt,
-#         "suggested_jql": None,
-#         "tool_calls": [],
-#         "tool_results": [],
-#         "validation_status": None,
-#         "final_jql": None
-#     }
-
-#     print(f"--- Starting Agent for Prompt: {initial_prompt} ---")
-
-#     # 3. Invoke the graph
-#     # The graph will run the loop (Agent -> Tools -> Agent) until it hits END.
-#     final_state = reactive_jql_app.invoke(initial_state)
-
-#     # 4. Print the final result
-#     print("\n--- Execution Complete ---")
-#     print("Final Suggested JQL:")
-#     # The agent's final output will be stored here
-#     print(final_state.get('suggested_jql', 'JQL not generated.'))
-
-#     print("\nHistory of Tool Calls and Results:")
-#     for result in final_state.get('tool_results', []):
-#         print(f"  - Tool Used: {result.tool_call_id} | Result: {result.content[:100]}...") # Truncate long results
+    # Without a prompt, keep running the tool checks
+    parser = argparse.ArgumentParser(description="Natural language to JQL")
+    parser.add_argument("prompt", nargs="?", help="Request in natural language")
+    parser.add_argument("--stream", action="store_true", help="Show progress events while the agent runs")
+    args = parser.parse_args()
+
+    if not args.prompt:
+        test_tools()
+        return
+
+    if args.stream:
+        asyncio.run(stream_agent(args.prompt))
+    else:
+        run_agent(args.prompt)
+
+
+def run_agent(initial_prompt: str):
+
+    print(f"--- Starting Agent for Prompt: {initial_prompt} ---")
+
+    # Invoke the graph
+    # The graph will run the loop (Agent -> Tools -> Agent -> Validate) until it hits END.
+    final_state = reactive_jql_app.invoke(create_initial_state(initial_prompt))
+
+    print("\n--- Execution Complete ---")
+    print_final_state(final_state)
+
+    print("\nHistory of Tool Calls and Results:")
+    for result in final_state.get('tool_results', []):
+        print(f"  - Tool Used: {result.tool_call_id} | Result: {result.content[:100]}...") # Truncate long results
+
+
+async def stream_agent(initial_prompt: str):
+
+    print(f"--- Streaming Agent for Prompt: {initial_prompt} ---")
+
+    # Show each event as it arrives: nodes, tool calls with timings and partial LLM output
+    async for event in astream_jql_events(initial_prompt):
+        stamp = f"[{event['elapsed']:7.2f}s]"
+
+        if event["type"] == "node_start":
+            print(f"\n{stamp} > {event['node']}")
+        elif event["type"] == "node_end":
+            print(f"\n{stamp} < {event['node']}")
+        elif event["type"] == "tool_start":
+            print(f"{stamp}   tool {event['tool']}({event['args']})")
+        elif event["type"] == "tool_end":
+            print(f"{stamp}   tool {event['tool']} done in {event['duration']:.2f}s")
+        elif event["type"] == "token":
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "final":
+            print(f"\n\n--- Execution Complete in {event['elapsed']:.2f}s ---")
+            print_final_state(event["state"] or {})
+
+
+def print_final_state(final_state: dict):
+    print(f"Final JQL: {final_state.get('final_jql') or 'JQL not generated.'}")
+    print(f"Validation: {final_state.get('validation_status')} | Results: {final_state.get('result_count')} | Fetch mode: {final_state.get('fetch_mode')}")
+    print(f"LLM calls: {final_state.get('llm_calls', 0)} | Tool calls: {final_state.get('tool_call_count', 0)} | Steps: {final_state.get('steps', 0)}")
+    if final_state.get("error"):
+        print(f"Error: {final_state['error']}")
 
 
 def test_tools():
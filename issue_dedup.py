@@ -0,0 +1,86 @@
+import os
+import unicodedata
+from typing import Dict, List
+from dotenv import load_dotenv
+from rapidfuzz import fuzz, process
+from jira_client import IssueInfo
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+
+def normalize_issue_text(issue: IssueInfo) -> str:
+    '''
+    Normaliza el resumen y la descripción de un issue para compararlos: minúsculas, sin
+    tildes, sólo letras y números, con espacios colapsados.
+    '''
+    text = f"{issue.summary or ''} {issue.description or ''}".lower()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c if c.isalnum() else " " for c in text if not unicodedata.combining(c))
+    return " ".join(text.split())
+
+
+def cluster_near_duplicates(issues: List[IssueInfo], threshold: float) -> List[List[IssueInfo]]:
+    '''
+    Agrupa los issues casi idénticos de una misma épica (clones, sub-tareas copiadas).
+
+    Dentro de cada épica, cada issue se compara contra los representantes de los grupos ya
+    formados; si la similitud alcanza el umbral (0-100) se suma a ese grupo, si no forma uno
+    nuevo. El primer issue de cada grupo es su representante. Se respeta el orden original.
+    '''
+    clusters: List[List[IssueInfo]] = []
+
+    # Representantes por épica: textos normalizados y el grupo al que corresponden
+    representatives: Dict[str, List[str]] = {}
+    rep_clusters: Dict[str, List[List[IssueInfo]]] = {}
+
+    for issue in issues:
+        text = normalize_issue_text(issue)
+        epic_texts = representatives.setdefault(issue.epic_key, [])
+        epic_clusters = rep_clusters.setdefault(issue.epic_key, [])
+
+        match = process.extractOne(
+            text, epic_texts, scorer=fuzz.token_sort_ratio, score_cutoff=threshold
+        ) if text and epic_texts else None
+
+        if match:
+            _, _, index = match
+            epic_clusters[index].append(issue)
+        else:
+            cluster = [issue]
+            epic_texts.append(text)
+            epic_clusters.append(cluster)
+            clusters.append(cluster)
+
+    return clusters
+
+
+def deduplicate_issues(issues: List[IssueInfo], output_manager) -> List[int]:
+    '''
+    Método que deja un solo issue por grupo de casi duplicados para el análisis con LLM.
+
+    Retorna las posiciones en la entrada de los issues a analizar. Los demás miembros de cada
+    grupo se registran en el OutputManager con su propia posición, para que el análisis del
+    representante se copie a cada uno en su lugar de la tabla. Se controla con ISSUE_DEDUP
+    (true/false) e ISSUE_DEDUP_THRESHOLD (similitud mínima, 0-100).
+    '''
+    if os.getenv("ISSUE_DEDUP", "false").lower() != "true":
+        return list(range(len(issues)))
+
+    threshold = float(os.getenv("ISSUE_DEDUP_THRESHOLD", "95"))
+    clusters = cluster_near_duplicates(issues, threshold)
+    positions = {issue.key: index for index, issue in enumerate(issues)}
+
+    for cluster in clusters:
+        if len(cluster) > 1:
+            output_manager.register_duplicates(
+                cluster[0].key,
+                [(positions[duplicate.key], duplicate) for duplicate in cluster[1:]]
+            )
+
+    representatives = [positions[cluster[0].key] for cluster in clusters]
+    logger.info("Deduplicación: %s issues en %s grupos (umbral %s)", len(issues), len(representatives), threshold)
+
+    return representatives
@@ -1,37 +1,86 @@
 import os
+import sys
+import time
+import threading
+from dataclasses import dataclass, replace
 from dotenv import load_dotenv
 from jira import JIRA, JIRAError
-from typing import List, Dict
+from requests import RequestException
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from business_info import BusinessInfo
-from pydantic import BaseModel, Field
+from text_preprocessor import TextPreprocessor
+from attachment_resolver import AttachmentResolver
+from jira_snapshot import JiraSnapshot
+from jira_session import JiraHttpMetrics, configure_jira_session, get_timeout
+from pydantic import BaseModel, Field, field_validator
+from enum import Enum
 from rapidfuzz import fuzz, process
+from log_config import get_logger
 
 load_dotenv
 
+logger = get_logger(__name__)
+
+# Campos de Jira que usa el análisis. Pedir sólo estos reduce el tamaño de cada recurso
+ISSUE_FIELDS = "summary,description,resolutiondate,parent"
+
+@dataclass(frozen=True, slots=True)
+class EpicInfo:
+    '''
+    Información compartida de una épica. Se crea una sola instancia por épica y todos
+    los issues hijos la referencian, en lugar de guardar cada uno el documento de negocio.
+    '''
+    key: str
+    business_info: Optional[str] = None
+    summary: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True, repr=False)
 class IssueInfo:
-    def __init__(
-            self,
-            key,
-            summary,
-            description,
-            resolution_date,
-            business_info = None,
-            epic_key = None,
-            epic_summary = None):
-        self.key = key
-        self.summary = summary
-        self.description = description
-        self.resolution_date = resolution_date
-        self.business_info = business_info
-        self.epic_key = epic_key
-        self.epic_summary = epic_summary
-    
+    key: str
+    summary: str
+    description: str
+    resolution_date: str
+    epic: Optional[EpicInfo] = None
+
+    @property
+    def epic_key(self) -> Optional[str]:
+        return self.epic.key if self.epic else None
+
+    @property
+    def epic_summary(self) -> Optional[str]:
+        return self.epic.summary if self.epic else None
+
+    @property
+    def business_info(self) -> Optional[str]:
+        return self.epic.business_info if self.epic else None
 
     def __repr__(self):
         return (f"IssueInfo(key={self.key}, summary={self.summary!r}, "
                 f"epic_key={self.epic_key}, resolved={self.resolution_date})")
 
 
+class ImpactLevel(str, Enum):
+    NULO = "Nulo"
+    BAJO = "Bajo"
+    MEDIO = "Medio"
+    ALTO = "Alto"
+
+
+class MetricImpact(BaseModel):
+    metrica: str = Field(..., description="Nombre de la métrica, tal como aparece en el documento de negocio")
+    nivel: ImpactLevel = Field(..., description="Nivel de impacto de la HU en la métrica: Nulo, Bajo, Medio o Alto")
+    justificacion: str = Field(..., description="Justificación breve del nivel de impacto asignado")
+
+    @field_validator("nivel", mode="before")
+    @classmethod
+    def normalize_level(cls, value):
+        '''Acepta variaciones de mayúsculas y espacios ("alto", " MEDIO ") antes de validar.'''
+        if isinstance(value, str):
+            return value.strip().capitalize()
+        return value
+
+
 class IssueAnalysis(BaseModel):
     issue_key: str = Field(..., description="La clave del issue de Jira (e.g, SVA-1000)")
     epic_key: str = Field(..., description="La clave de la épica del issue de Jira (e.g., GOBI-800)")
@@ -39,8 +88,18 @@ class IssueAnalysis(BaseModel):
     resumen: str = Field(..., description="Descripción de máximo 10 palabras del issue")
     valor_negocio: str = Field(..., description="Resumen de máximo 25 palabras del valor de negocio de la HU, considerando sólo objetivos de la iniciativa.")
     metrica_impactada: str = Field(..., description="Nombre de la métrica principal impactada por la HU.")
-    impactos_globales: str = Field(..., description="Lista del nivel de impacto en todas las métricas")
-    justificaciones: str = Field(..., description="Justificaciones para los impactos de cada métrica")
+    impactos: List[MetricImpact] = Field(..., description="Nivel de impacto y justificación para cada una de las métricas definidas")
+
+
+    @property
+    def impactos_globales(self) -> str:
+        '''Niveles de impacto en formato de texto ("Métrica: Nivel, ..."), para reportes.'''
+        return ", ".join(f"{i.metrica}: {i.nivel.value}" for i in self.impactos)
+
+    @property
+    def justificaciones(self) -> str:
+        '''Justificaciones por métrica en formato de texto, para reportes.'''
+        return "\n".join(f"{i.metrica}: {i.justificacion}" for i in self.impactos)
 
 
     def to_text_report(self, issue_key: str) -> str:
@@ -94,115 +153,473 @@ class JiraClient:
         user = os.getenv("JIRA_USER")
         token = os.getenv("JIRA_API_TOKEN")
         options = {"server": server}
-        self.client = JIRA(options, basic_auth=(user, token))
+
+        # Con JIRA_SNAPSHOT_MODE=replay los datos salen de un snapshot local y no hay conexión
+        self.snapshot = JiraSnapshot.from_env()
+
+        # Sesión HTTP con tiempos máximos, pool de conexiones y reintentos ante 429/5xx. Los
+        # reintentos propios de la librería se desactivan, porque los hace el adaptador
+        self.http_metrics = JiraHttpMetrics()
+        self.client = None
+        if not self.snapshot.replaying:
+            self.client = JIRA(options, basic_auth=(user, token), timeout=get_timeout(), max_retries=0)
+            configure_jira_session(self.client._session, self.http_metrics)
+
+        # Resolución y descarga de los documentos de negocio adjuntos a las épicas
+        self.attachment_resolver = AttachmentResolver(self.client)
+
+        # Validaciones de JQL ya hechas (JQL normalizada -> (resultado, expiración))
+        self._jql_validations = {}
+        self._jql_lock = threading.Lock()
+        self.jql_validation_ttl = float(os.getenv("JQL_VALIDATION_CACHE_TTL_SECONDS", "300"))
 
 
     def get_issues_from_filter(self, filter_id):
         '''Método para traer los issues contenidos en algún filtro, a través de la API de Jira.
         '''
         
-        print(f"Fetching all issues from Jira filter {filter_id}")
+        logger.info("Fetching all issues from Jira filter %s", filter_id)
         
+        if self.snapshot.replaying:
+            issues = list(self.snapshot.iter_filter_issues(filter_id))
+            logger.info("Found %s issues (snapshot).", len(issues))
+            return issues
+
         # Obtiene toda la información de los issues directo desde Jira
-        # Clase Issue de la librería de Jira
-        issues = self.client.search_issues(f"filter={filter_id}", maxResults=False)
+        # Clase Issue de la librería de Jira. Sólo se piden los campos que usa el análisis
+        issues = self.client.search_issues(f"filter={filter_id}", maxResults=False, fields=ISSUE_FIELDS)
+
+        if self.snapshot.recording:
+            self.snapshot.start_filter(filter_id)
+            for issue in issues:
+                self.snapshot.record_issue(filter_id, issue.raw)
         
         # Informar y retonar issues
-        print(f"Found {len(issues)} issues.")
+        logger.info("Found %s issues.", len(issues))
         return issues
+
+
+    def iter_issues_from_filter(self, filter_id, page_size: int = None) -> Iterator:
+        '''Método para recorrer los issues de un filtro página a página.
+
+        A diferencia de get_issues_from_filter, no mantiene todos los recursos de Jira en
+        memoria: cada página se libera en cuanto se consumen sus issues.
+        '''
+
+        if self.snapshot.replaying:
+            yield from self.snapshot.iter_filter_issues(filter_id)
+            return
+
+        page_size = page_size or int(os.getenv("JIRA_PAGE_SIZE", "100"))
+        logger.info("Fetching issues from Jira filter %s (page size %s)", filter_id, page_size)
+
+        if self.snapshot.recording:
+            self.snapshot.start_filter(filter_id)
+
+        start_at = 0
+        while True:
+            # Pedir una página con los campos mínimos
+            page = self.client.search_issues(
+                f"filter={filter_id}",
+                startAt=start_at,
+                maxResults=page_size,
+                fields=ISSUE_FIELDS
+            )
+
+            if not page:
+                break
+
+            start_at += len(page)
+            total = page.total
+
+            # Entregar los issues de la página, soltando la referencia a cada uno
+            while page:
+                issue = page.pop(0)
+                if self.snapshot.recording:
+                    self.snapshot.record_issue(filter_id, issue.raw)
+                yield issue
+
+            if start_at >= total:
+                break
+
+        logger.info("Found %s issues.", start_at)
     
     
-    def proccess_issue_list_info(self, issues) -> List[IssueInfo]:
+    def iter_issues_from_filters(self, filter_ids: List[str], membership: Dict[str, List[str]] = None) -> Iterator:
+        '''Método para recorrer los issues de varios filtros, entregando cada issue una sola vez.
+
+        Los filtros suelen compartir issues; los repetidos se omiten. Si se entrega membership,
+        se llena con las claves de los issues de cada filtro, en el orden del filtro.
+        '''
+        if membership is None:
+            membership = {}
+
+        seen = set()
+        for filter_id in filter_ids:
+            keys = membership.setdefault(filter_id, [])
+
+            for issue in self.iter_issues_from_filter(filter_id):
+                keys.append(issue.key)
+                if issue.key in seen:
+                    continue
+
+                seen.add(issue.key)
+                yield issue
+
+        if len(filter_ids) > 1:
+            total = sum(len(keys) for keys in membership.values())
+            logger.info("%s filtros: %s issues, %s distintos", len(filter_ids), total, len(seen))
+
+
+    def get_http_stats(self) -> dict:
+        '''
+        Método que entrega las métricas de las llamadas a Jira (latencia, reintentos, limitación de tasa)
+        '''
+        return self.http_metrics.summary()
+
+
+    def save_snapshot(self) -> None:
+        '''
+        Método que guarda el snapshot de los datos leídos desde Jira, si se está grabando
+        '''
+        self.snapshot.save()
+
+
+    def validate_jql(self, jql: str) -> dict:
+        '''Método para validar una JQL contra Jira sin traer issues.
+
+        Primero revisa la sintaxis con el endpoint de parseo de JQL (si el servidor lo tiene)
+        y luego cuenta los resultados con una búsqueda de maxResults=0. Retorna un diccionario
+        con "valid", "count" y "error". Los resultados se guardan por un tiempo
+        (JQL_VALIDATION_CACHE_TTL_SECONDS), para no repetir consultas con la misma JQL.
+        '''
+        normalized = " ".join((jql or "").split())
+        if not normalized:
+            return {"valid": False, "count": None, "error": "La JQL está vacía"}
+        if self.snapshot.replaying:
+            return {"valid": False, "count": None, "error": "Sin conexión a Jira (snapshot en modo replay)"}
+
+        with self._jql_lock:
+            cached = self._jql_validations.get(normalized)
+            if cached and cached[1] > time.monotonic():
+                return dict(cached[0])
+
+        error = self._parse_jql(normalized)
+        count = None
+
+        if error is None:
+            try:
+                count = self.client.search_issues(normalized, maxResults=0, fields="key").total
+            except JIRAError as e:
+                error = e.text or str(e)
+            except RequestException as e:
+                # Falla de conexión o timeout (ya reintentada): no se guarda, la JQL puede ser válida
+                logger.warning("No fue posible contar los resultados de la JQL: %s", e)
+                return {"valid": False, "count": None, "error": f"No fue posible consultar Jira: {e}"}
+
+        result = {"valid": error is None, "count": count, "error": error}
+
+        with self._jql_lock:
+            self._jql_validations[normalized] = (result, time.monotonic() + self.jql_validation_ttl)
+
+        return dict(result)
+
+
+    def _parse_jql(self, jql: str) -> Optional[str]:
+        '''
+        Revisa la sintaxis de una JQL con el endpoint jql/parse. Retorna el mensaje de error,
+        o None si es válida o si el servidor no tiene el endpoint (la búsqueda la valida igual).
+        '''
+        try:
+            response = self.client._session.post(
+                self.client._get_url("jql/parse"),
+                params={"validation": "strict"},
+                json={"queries": [jql]}
+            )
+        except JIRAError as e:
+            if e.status_code in (404, 405):
+                return None
+            return e.text or str(e)
+        except Exception:
+            return None
+
+        for query in response.json().get("queries", []):
+            if query.get("errors"):
+                return "; ".join(query["errors"])
+
+        return None
+
+
+    def proccess_issue_list_info(self, issues: Iterable, resolve_epics: bool = True) -> List[IssueInfo]:
         '''Método para obtener la información de cada HU dentro de una lista.
+
+        Acepta cualquier iterable de issues (por ejemplo, iter_issues_from_filter), de modo que
+        los recursos de Jira se pueden liberar en cuanto se extraen sus campos. Las épicas se
+        resuelven al final, todas juntas, con pocas consultas a Jira. Con resolve_epics=False
+        las épicas quedan sólo con su clave (no se descargan documentos).
         '''
         
         # Colección para información de HUs.
         info_collection = []
 
+        # Épicas encontradas en los issues (sólo la clave, hasta resolverlas)
+        epics: Dict[str, EpicInfo] = {}
+
         # Por cada HU dentro de la lista original
         for issue in issues:
 
             # Leer información de la HU desde la API de Jira
-            issue_info = self._get_issue_info(issue)
+            issue_info = self._get_issue_info(issue, epics)
 
             # Agregar a la colección
             info_collection.append(issue_info)
 
-        # Retornar la colección
-        return info_collection
+        if not resolve_epics:
+            return info_collection
+
+        # Resolver todas las épicas distintas en bloque (documento de negocio y resumen)
+        resolved = self.get_epics_info(list(epics))
+
+        # Retornar la colección, con cada issue apuntando a la información compartida de su épica
+        return [
+            replace(info, epic=resolved[info.epic_key]) if info.epic else info
+            for info in info_collection
+        ]
     
 
-    def _get_issue_info(self, issue) -> IssueInfo:
+    def _get_issue_info(self, issue, epics: Dict[str, EpicInfo] = None) -> IssueInfo:
         '''
         Método para obtener la información de un issue a través de la API de Jira
         
         Recibe el issue desde la clase de la librería de Jira y lo transforma en la estructura
-        de IssueInfo, que es la que contiene lo necesario para este análisis.'''
+        de IssueInfo, que es la que contiene lo necesario para este análisis. La épica queda
+        sólo con su clave; el contexto de negocio se resuelve después con get_epics_info.'''
+
+        if epics is None:
+            epics = {}
 
         issue_key = issue.key
         summary = issue.fields.summary
-        description = issue.fields.description
+        # La descripción se limpia (marcas de Jira, código, logs) y se ajusta al presupuesto de tokens
+        description = TextPreprocessor().prepare("description", issue.fields.description)
         resolution_date = issue.fields.resolutiondate or "not resolved"
-        epic_key = issue.fields.parent.key
-        epic_summary = None
+        parent = getattr(issue.fields, "parent", None)
+        epic_key = sys.intern(parent.key) if parent else None
+
+        # Si hay una épica asociada, referenciar la instancia compartida
+        epic = None
+        if epic_key:
+            epic = epics.setdefault(epic_key, EpicInfo(key=epic_key))
+
+        # Retornar la clase con todos los detalles
+        return IssueInfo(
+            key=issue_key,
+            summary=summary,
+            description=description,
+            resolution_date=resolution_date,
+            epic=epic
+        )
+
+
+    def get_epics_info(self, epic_keys: List[str]) -> Dict[str, EpicInfo]:
+        '''
+        Método para obtener la información de varias épicas con pocas consultas a Jira.
+
+        Busca las épicas con "key in (...)" en bloques que respetan el largo máximo de la JQL,
+        pidiendo sólo resumen y adjuntos. Las épicas que no aparezcan en la búsqueda se leen
+        una a una, como antes.
+        '''
+        epics: Dict[str, EpicInfo] = {}
+
+        # Desde el snapshot: resumen y documento grabados, sin consultas
+        if self.snapshot.replaying:
+            return {
+                epic_key: EpicInfo(
+                    key=epic_key,
+                    business_info=self._get_business_info(epic_key),
+                    summary=self.snapshot.get_epic_summary(epic_key)
+                )
+                for epic_key in epic_keys
+            }
+
+        for chunk in self._chunk_keys_for_jql(epic_keys):
+            try:
+                results = self.client.search_issues(
+                    f"key in ({', '.join(chunk)})",
+                    fields="attachment,summary",
+                    maxResults=len(chunk)
+                )
+            except JIRAError as e:
+                logger.warning("Error buscando épicas en bloque (%s). Se leerán una a una.", e.status_code)
+                continue
+
+            for epic_issue in results:
+                epic_key = sys.intern(epic_issue.key)
+                if self.snapshot.recording:
+                    self.snapshot.record_epic(epic_key, summary=epic_issue.fields.summary)
+                epics[epic_key] = EpicInfo(
+                    key=epic_key,
+                    business_info=self._get_business_info(epic_key, epic_issue.fields.attachment),
+                    summary=epic_issue.fields.summary
+                )
+
+        # Épicas que no vinieron en la búsqueda (por ejemplo, movidas a otro proyecto)
+        for epic_key in epic_keys:
+            if epic_key not in epics:
+                epics[epic_key] = EpicInfo(key=epic_key, business_info=self._get_business_info(epic_key))
+
+        logger.info("Resueltas %s épicas", len(epic_keys))
+        return epics
+
+
+    def get_epics_metadata(self, epic_keys: List[str]) -> Dict[str, dict]:
+        '''
+        Método para obtener sólo los metadatos de varias épicas, sin descargar documentos.
+
+        Entrega por épica su resumen, el nombre del documento de negocio y su tamaño en bytes
+        (según Jira). Lo usa el planificador de ejecución (dry run) para estimar tokens.
+        '''
+        metadata: Dict[str, dict] = {}
+
+        # Desde el snapshot, el tamaño es el del texto grabado
+        if self.snapshot.replaying:
+            for epic_key in epic_keys:
+                document, ok = self.snapshot.get_epic_document(epic_key)
+                metadata[epic_key] = {
+                    "summary": self.snapshot.get_epic_summary(epic_key),
+                    "document": f"{epic_key}.txt" if ok else None,
+                    "document_bytes": len(document.encode("utf-8")) if ok else 0
+                }
+            return metadata
+
+        for chunk in self._chunk_keys_for_jql(epic_keys):
+            try:
+                results = self.client.search_issues(
+                    f"key in ({', '.join(chunk)})",
+                    fields="attachment,summary",
+                    maxResults=len(chunk)
+                )
+            except JIRAError as e:
+                logger.warning("Error buscando épicas en bloque (%s). Se omiten sus documentos.", e.status_code)
+                continue
+
+            for epic_issue in results:
+                attachment = self.attachment_resolver.find_attachment(epic_issue.key, epic_issue.fields.attachment)
+                metadata[epic_issue.key] = {
+                    "summary": epic_issue.fields.summary,
+                    "document": attachment.filename if attachment else None,
+                    "document_bytes": (getattr(attachment, "size", None) or 0) if attachment else 0
+                }
+
+        # Épicas que no vinieron en la búsqueda: sin documento conocido
+        for epic_key in epic_keys:
+            metadata.setdefault(epic_key, {"summary": None, "document": None, "document_bytes": 0})
+
+        return metadata
+
+
+    def _chunk_keys_for_jql(self, keys: List[str]) -> Iterator[List[str]]:
+        '''
+        Divide las claves en bloques que respetan la cantidad y el largo máximo de una JQL
+        '''
+        max_keys = int(os.getenv("JIRA_KEYS_PER_QUERY", "100"))
+        max_length = int(os.getenv("JIRA_MAX_JQL_LENGTH", "6000"))
+
+        chunk, length = [], 0
+        for key in keys:
+            if chunk and (len(chunk) >= max_keys or length + len(key) + 2 > max_length):
+                yield chunk
+                chunk, length = [], 0
+
+            chunk.append(key)
+            length += len(key) + 2
+
+        if chunk:
+            yield chunk
+
+
+    def _get_business_info(self, epic_key: str, attachments=None) -> str:
+        '''
+        Método para obtener el documento de negocio de una épica, usando el caché de BusinessInfo.
+        Si ya se tienen los adjuntos de la épica, se usan sin volver a consultarla.
+        '''
 
         # Agregar información de business info si existe
         # En esta versión, busca directo en la épica
         business_info = BusinessInfo()
 
-        # Si hay una épica asociada
-        if epic_key:
+        # Obtener del contexto ya cargado para esta épica (None si no ha sido leído)
+        info = business_info.get_epic(epic_key)
+
+        # Si no ha sido leído
+        if info is None:
+            # Leer el archivo desde Jira
+            info, ok = self._read_epic_document(epic_key, attachments)
+
+            if ok:
+                # Asignar a la info de negocios. Se guarda ya preprocesado, para no repetir
+                # la limpieza en cada HU de la épica
+                info = TextPreprocessor().prepare("business_info", info)
 
-            # Validar si ya fue leído si archivo
-            exists = business_info.epic_already_read(epic_key)
-            
-            # Si no ha sido leído
-            if not exists:
-                # Leer el archivo desde Jira y asignar a la info de negocios
-                info = self.get_epic_info(epic_key)
-                
                 # Agregar a la lista de contextos de negocios ya encontrados, para no tener
                 # que hacer la consulta de nuevo si aparece otra HU relacionada
                 business_info.add_epic_to_list(epic_key, info)
-
             else:
-                # Obtener del contexto ya cargado para esta épica
-                info = business_info.get_epic_from_list(epic_key)
+                # Las fallas se recuerdan sólo por un tiempo corto, aparte de los documentos
+                business_info.add_epic_failure(epic_key, info)
 
-        # Retornar la clase con todos los detalles, incluyendo el contexto de negocios
-        return IssueInfo(
-            key=issue_key,
-            summary=summary,
-            description=description,
-            resolution_date=resolution_date,
-            business_info=info,
-            epic_key=epic_key,
-            epic_summary=epic_summary
-        )
+        return info
     
 
-    def get_epic_info(self, epic_key: str) -> str:
+    def get_epic_info(self, epic_key: str, attachments=None) -> str:
+        '''
+        Método para obtener el documento de negocio adjunto a una épica. Si no se puede leer,
+        retorna un mensaje que explica la falla.
+        '''
+        info, _ = self._read_epic_document(epic_key, attachments)
+        return info
 
-        try:
-            # Buscar la información de la épica
-            epic_issue = self.client.issue(epic_key)
 
-            # Adjuntar extensión al nombre del archivo
-            filename = epic_key + ".txt"
+    def _read_epic_document(self, epic_key: str, attachments=None) -> Tuple[str, bool]:
+        '''
+        Lee el documento de negocio de una épica. Retorna el texto (o el mensaje de falla)
+        y si la lectura fue exitosa. Con snapshot, lo entrega desde ahí (replay) o lo graba (record).
+        '''
+        if self.snapshot.replaying:
+            return self.snapshot.get_epic_document(epic_key)
+
+        document, ok = self._download_epic_document(epic_key, attachments)
+
+        if self.snapshot.recording:
+            self.snapshot.record_epic(epic_key, document=document, ok=ok)
+
+        return document, ok
+
+
+    def _download_epic_document(self, epic_key: str, attachments=None) -> Tuple[str, bool]:
+        '''
+        Descarga el documento de negocio de una épica desde Jira
+        '''
+
+        # Adjuntar extensión al nombre del archivo
+        filename = epic_key + ".txt"
+
+        try:
+            # Buscar la información de la épica, si no se entregaron sus adjuntos. Sólo se piden los adjuntos
+            if attachments is None:
+                epic_issue = self.client.issue(epic_key, fields="attachment")
+                attachments = epic_issue.fields.attachment
 
-            # Iterar en los adjuntos obtenidos de la épica
-            for attachment in epic_issue.fields.attachment:
+            # Buscar el adjunto en el índice de la épica, descargarlo y obtener su texto
+            content = self.attachment_resolver.resolve(epic_key, attachments)
 
-                # Si el nombre del archivo buscado corresponde al attachment, leerlo
-                if filename.lower() in attachment.filename.lower():
-                    file_content = attachment.get()
-                    print(f"Detalles de la iniciativa de negocios encontrados en {epic_key}")
-                    return file_content.decode('utf-8')
+            if content is not None:
+                return content, True
                 
-            return f"Archivo de información de negocio {filename} no encontrado"
+            return f"Archivo de información de negocio {filename} no encontrado", False
             
         except Exception as e:
-            return f"Error al intentar obtener información de negocios para épica {epic_key}: {str(e)}"
+            return f"Error al intentar obtener información de negocios para épica {epic_key}: {str(e)}", False
 
     
     # This method should be retired
@@ -261,7 +678,7 @@ class JiraClient:
         field_list = []
         for field in fields:
             # field_list.append(field.name)
-            print(f"{field['name']}")
+            logger.debug("%s", field['name'])
 
         return list
     
@@ -353,7 +770,7 @@ class JiraClient:
         fields = self.client.fields()
 
         for field in fields:
-            print(field.get('name'))
+            logger.debug("%s", field.get('name'))
             if field.get("name") == field_name:
                 custom_field_id = field.get("id")
                 break
@@ -406,11 +823,11 @@ class JiraClient:
             return response_data.get('values', [])
 
         except JIRAError as e:
-            print(f"Error accessing configuration contexts for {custom_field_id}. Status: {e.status_code}")
+            logger.warning("Error accessing configuration contexts for %s. Status: %s", custom_field_id, e.status_code)
             # If the user doesn't have permissions or the field doesn't support contexts.
             return []
         except Exception as e:
-            print(f"Unexpected error retrieving field configurations: {e}")
+            logger.warning("Unexpected error retrieving field configurations: %s", e)
             return []
 
 
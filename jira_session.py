@@ -0,0 +1,136 @@
+import os
+import threading
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Respuestas de Jira que se reintentan: limitación de tasa y fallas transitorias del servidor
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Sólo se reintentan los métodos idempotentes; un POST podría crear o modificar datos dos veces
+RETRY_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# Conexiones a Jira que se mantienen abiertas si no se define JIRA_HTTP_POOL_SIZE. La lectura
+# de Jira es secuencial; el pool cubre las pocas llamadas simultáneas (adjuntos, agente JQL)
+DEFAULT_POOL_SIZE = 4
+
+
+class JiraHttpMetrics:
+    '''
+    Métricas de las llamadas HTTP a Jira: cantidad, latencia, reintentos y limitación de tasa
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.retries = 0
+        self.throttled = 0
+        self.retry_after_seconds = 0.0
+        self.retries_by_status = {}
+
+
+    def record_response(self, response, *args, **kwargs):
+        # Hook de respuesta de requests: una vez por respuesta final (después de los reintentos)
+        seconds = response.elapsed.total_seconds()
+        with self._lock:
+            self.requests += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+
+    def record_retry(self, status, retry_after: float = None) -> None:
+        with self._lock:
+            self.retries += 1
+            key = str(status) if status else "error"
+            self.retries_by_status[key] = self.retries_by_status.get(key, 0) + 1
+            if status == 429:
+                self.throttled += 1
+            if retry_after:
+                self.retry_after_seconds += retry_after
+
+        if status == 429:
+            logger.warning("Jira con limitación de tasa (429). Reintentando en %s segundos", retry_after or "backoff")
+        else:
+            logger.info("Reintentando llamada a Jira (%s)", status or "error de conexión")
+
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "mean_seconds": round(self.total_seconds / self.requests, 3) if self.requests else 0.0,
+                "max_seconds": round(self.max_seconds, 3),
+                "retries": self.retries,
+                "retries_by_status": dict(self.retries_by_status),
+                "throttled": self.throttled,
+                "retry_after_seconds": round(self.retry_after_seconds, 1)
+            }
+
+
+class MetricsRetry(Retry):
+    '''
+    Política de reintentos de urllib3 que informa cada reintento a JiraHttpMetrics.
+    Respeta el encabezado Retry-After de Jira; si no viene, usa backoff exponencial.
+    '''
+
+    def __init__(self, *args, metrics: JiraHttpMetrics = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics
+
+
+    def new(self, **kwargs):
+        # urllib3 crea una instancia nueva por intento; las métricas se comparten
+        retry = super().new(**kwargs)
+        retry.metrics = self.metrics
+        return retry
+
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if self.metrics is not None:
+            retry_after = self.get_retry_after(response) if response is not None else None
+            self.metrics.record_retry(getattr(response, "status", None), retry_after)
+
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def get_timeout() -> tuple:
+    '''
+    Tiempos máximos de conexión y de lectura para las llamadas a Jira (segundos)
+    '''
+    return (
+        float(os.getenv("JIRA_CONNECT_TIMEOUT_SECONDS", "5")),
+        float(os.getenv("JIRA_READ_TIMEOUT_SECONDS", "60"))
+    )
+
+
+def configure_jira_session(session, metrics: JiraHttpMetrics) -> None:
+    '''
+    Configura la sesión HTTP del cliente de Jira: pool de conexiones, reintentos y métricas.
+
+    El pool (JIRA_HTTP_POOL_SIZE) reutiliza conexiones en lugar de abrir una por llamada.
+    Las respuestas 429 y 5xx de métodos idempotentes se reintentan hasta JIRA_MAX_RETRIES
+    veces, respetando Retry-After o con backoff exponencial (JIRA_BACKOFF_FACTOR).
+    '''
+    pool_size = int(os.getenv("JIRA_HTTP_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+
+    retry = MetricsRetry(
+        total=int(os.getenv("JIRA_MAX_RETRIES", "5")),
+        backoff_factor=float(os.getenv("JIRA_BACKOFF_FACTOR", "1")),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        metrics=metrics
+    )
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks.setdefault("response", []).append(metrics.record_response)
@@ -0,0 +1,146 @@
+import os
+import gzip
+import json
+import threading
+from typing import Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+class JiraSnapshot:
+    '''
+    Copia local de los datos de Jira que usa el análisis, para repetir ejecuciones sin red.
+
+    En modo "record" se guardan los issues de cada filtro (JSON crudo de Jira, sólo con los
+    campos pedidos) y, por épica, su resumen y el texto de su documento de negocio. En modo
+    "replay" esos mismos datos se entregan desde el archivo, sin conectarse a Jira. El archivo
+    es JSON comprimido con gzip (JIRA_SNAPSHOT_PATH).
+    '''
+
+    def __init__(self, path: str, mode: str = ""):
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.data = {"version": SNAPSHOT_VERSION, "filters": {}, "epics": {}}
+
+        if self.replaying:
+            self.load()
+
+
+    @classmethod
+    def from_env(cls) -> "JiraSnapshot":
+        '''
+        Crea el snapshot según JIRA_SNAPSHOT_MODE ("record", "replay" o vacío) y JIRA_SNAPSHOT_PATH
+        '''
+        mode = os.getenv("JIRA_SNAPSHOT_MODE", "").lower()
+        path = os.getenv("JIRA_SNAPSHOT_PATH", os.path.join("snapshots", "jira_snapshot.json.gz"))
+        return cls(path, mode)
+
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+
+    def load(self) -> None:
+        '''
+        Método que lee el snapshot desde el archivo
+        '''
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Versión de snapshot no soportada en {self.path}: {data.get('version')}")
+
+        self.data = data
+        logger.info("Snapshot de Jira cargado desde %s (%s filtros, %s épicas)", self.path, len(data['filters']), len(data['epics']))
+
+
+    def save(self) -> None:
+        '''
+        Método que escribe el snapshot (sólo en modo "record")
+        '''
+        if not self.recording:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            with gzip.open(self.path, "wt", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, separators=(",", ":"))
+
+        logger.info("Snapshot de Jira guardado en %s", self.path)
+
+
+    def start_filter(self, filter_id) -> None:
+        '''
+        Método que comienza (o reinicia) la grabación de los issues de un filtro
+        '''
+        with self._lock:
+            self.data["filters"][str(filter_id)] = []
+
+
+    def record_issue(self, filter_id, raw: dict) -> None:
+        with self._lock:
+            self.data["filters"].setdefault(str(filter_id), []).append(raw)
+
+
+    def get_filter_issues(self, filter_id) -> List[dict]:
+        '''
+        Método que entrega los issues grabados de un filtro (JSON crudo)
+        '''
+        issues = self.data["filters"].get(str(filter_id))
+        if issues is None:
+            raise KeyError(f"El filtro {filter_id} no está en el snapshot {self.path}")
+        return issues
+
+
+    def iter_filter_issues(self, filter_id) -> Iterator:
+        '''
+        Método que recorre los issues grabados de un filtro como recursos de la librería de Jira
+        '''
+        from jira.resources import Issue
+
+        options = {"server": os.getenv("JIRA_SERVER", "")}
+        for raw in self.get_filter_issues(filter_id):
+            yield Issue(options, None, raw=raw)
+
+
+    def record_epic(self, epic_key: str, summary: str = None, document: str = None, ok: bool = None) -> None:
+        '''
+        Método que graba el resumen y/o el documento de negocio de una épica
+        '''
+        with self._lock:
+            epic = self.data["epics"].setdefault(epic_key, {"summary": None, "document": None, "ok": False})
+            if summary is not None:
+                epic["summary"] = summary
+            if document is not None:
+                epic["document"] = document
+                epic["ok"] = bool(ok)
+
+
+    def get_epic_summary(self, epic_key: str) -> Optional[str]:
+        return self.data["epics"].get(epic_key, {}).get("summary")
+
+
+    def get_epic_document(self, epic_key: str) -> Tuple[str, bool]:
+        '''
+        Método que entrega el documento de negocio grabado de una épica y si la lectura fue exitosa
+        '''
+        epic = self.data["epics"].get(epic_key)
+        if epic is None or epic.get("document") is None:
+            return f"La épica {epic_key} no está en el snapshot {self.path}", False
+        return epic["document"], epic["ok"]
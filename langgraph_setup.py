@@ -1,15 +1,20 @@
-from typing import TypedDict, List, Union, Any
+from typing import TypedDict, List, Union, Any, AsyncIterator
 from langchain_core.tools import tool
 from jira_client import JiraClient
 from langchain_core.messages import ToolCall, ToolMessage as ToolResult
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 from dotenv import load_dotenv
 import os
+import time
+from log_config import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 
 # Assuming your JiraClient methods (get_all_projects, get_celula_dropdown_options, etc.)
 # are now available as callable functions.
@@ -22,6 +27,16 @@ class JQLAnalysisState(TypedDict):
     tool_results: List[ToolResult]
     validation_status: Union[str, None]
     final_jql: Union[str, None]
+    validation_error: Union[str, None]
+    validation_attempts: int
+    result_count: Union[int, None]
+    fetch_mode: Union[str, None]
+    # Per-run counters and budget status (see AGENT_MAX_* below)
+    started_at: Union[float, None]
+    steps: int
+    llm_calls: int
+    tool_call_count: int
+    error: Union[dict, None]
 
 
 jira_client = JiraClient()
@@ -47,7 +62,7 @@ JIRA_TOOLS = [
         get_celula_dropdown_options
     ]
 
-api_key = os.getenv("LLM_API_KEY")
+api_key = os.getenv("GEMINI_API_KEY") or os.getenv("LLM_API_KEY")
 
 llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash",
                             api_key = api_key,
@@ -55,12 +70,61 @@ llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash",
                         )
 llm_with_tools = llm.bind_tools(JIRA_TOOLS)
 
+# Validation limits: how many candidate JQLs are checked against Jira before giving up,
+# and up to how many results a query is fetched in a single bulk request
+MAX_VALIDATION_ATTEMPTS = int(os.getenv("JQL_MAX_VALIDATION_ATTEMPTS", "3"))
+BULK_FETCH_MAX_RESULTS = int(os.getenv("JQL_BULK_FETCH_MAX_RESULTS", os.getenv("JIRA_PAGE_SIZE", "100")))
+
+
+# Loop guard: limits for one translation. When one is hit the graph stops in the fallback node
+MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "8"))
+MAX_TOOL_CALLS = int(os.getenv("AGENT_MAX_TOOL_CALLS", "10"))
+MAX_SECONDS = float(os.getenv("AGENT_MAX_SECONDS", "60"))
+
+
+def budget_exceeded(state: JQLAnalysisState, pending_tool_calls: int = 0) -> Union[dict, None]:
+    '''Returns a description of the first exceeded limit, or None if the run is within budget.'''
+    elapsed = round(time.monotonic() - (state.get("started_at") or time.monotonic()), 2)
+    steps = state.get("steps", 0)
+    tool_calls = state.get("tool_call_count", 0) + pending_tool_calls
+
+    # Steps and time are spent once they reach the limit; tool calls only when they go over it
+    checks = [
+        ("max_steps", steps, MAX_STEPS, steps >= MAX_STEPS),
+        ("max_tool_calls", tool_calls, MAX_TOOL_CALLS, tool_calls > MAX_TOOL_CALLS),
+        ("max_seconds", elapsed, MAX_SECONDS, elapsed >= MAX_SECONDS)
+    ]
+
+    for reason, value, limit, exceeded in checks:
+        if limit > 0 and exceeded:
+            return {"reason": reason, "value": value, "limit": limit}
+
+    return None
+
+
+def extract_jql(content) -> str:
+    '''Returns the JQL text from the LLM response, without markdown fences or quotes.'''
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("\n") + 1:] if "\n" in text else text
+    return text.strip().strip("`").strip()
+
 
 # Define the Agent logic
-def agent_node(state: JQLAnalysisState) -> JQLAnalysisState:
-    print("\n" + "="*50)
-    print("🤖 ENTERING AGENT NODE (Decision Maker)")
-    print("="*50)
+def agent_node(state: JQLAnalysisState, config: RunnableConfig = None) -> JQLAnalysisState:
+    logger.info("🤖 ENTERING AGENT NODE (Decision Maker)")
+
+    # Per-run counters. The clock starts with the first agent step
+    started_at = state.get("started_at") or time.monotonic()
+    counters = {
+        "started_at": started_at,
+        "steps": state.get("steps", 0) + 1,
+        "llm_calls": state.get("llm_calls", 0) + 1
+    }
 
     # 1. Determine the status of the conversation history
     # This flag is the CRITICAL logical switch for the LLM's behavior
@@ -72,6 +136,15 @@ def agent_node(state: JQLAnalysisState) -> JQLAnalysisState:
         for r in state.get('tool_results', [])
     ]
 
+    # A rejected JQL goes back to the agent together with the Jira error, so it can fix it
+    if state.get("validation_error"):
+        history_exists = "TRUE"
+        tool_history.append((
+            "user",
+            f"Validation Error: the JQL `{state.get('suggested_jql')}` was rejected by Jira: "
+            f"{state['validation_error']}. Respond ONLY with a corrected JQL."
+        ))
+
     # --- System Prompt Definition ---
     system_prompt = (
         "You are a highly capable JQL query generator. Your sole mission is to produce a single, valid JQL string that directly answers the user's request. The JQL field for 'Celula' is always written as '\"Celula[Dropdown]\"'.\n"
@@ -122,28 +195,25 @@ def agent_node(state: JQLAnalysisState) -> JQLAnalysisState:
     agent_runnable = prompt | llm_with_tools
     
     # Note: Removed the retry logic for clarity, but keep it if rate limits are an issue.
+    # The node config carries the graph callbacks, so token streaming reaches astream_events
     response = agent_runnable.invoke({
         "user_prompt": state["user_prompt"],
         "tool_history": tool_history,
         "history_exists": history_exists # Pass the flag to the runnable
-    })
+    }, config)
 
     # 4. Process the LLM's output (Decision Point)
     if response.tool_calls:
-        print(f"➡️ AGENT DECISION: Calling {len(response.tool_calls)} Tool(s). Moving to 'tools' node.")
-        print("="*50)
-        return {"tool_calls": response.tool_calls}
+        logger.info("➡️ AGENT DECISION: Calling %s Tool(s). Moving to 'tools' node.", len(response.tool_calls))
+        return {"tool_calls": response.tool_calls, **counters}
     else:
-        print("✅ AGENT DECISION: Final JQL Generated. Moving to 'END' node.")
-        print("="*50)
-        return {"suggested_jql": response.content}
+        logger.info("✅ AGENT DECISION: Final JQL Generated. Moving to 'validate' node.")
+        return {"suggested_jql": extract_jql(response.content), "tool_calls": [], **counters}
 
 
-def tool_execution_node(state: JQLAnalysisState) -> JQLAnalysisState:
+def tool_execution_node(state: JQLAnalysisState, config: RunnableConfig = None) -> JQLAnalysisState:
 
-    print("\n" + "#"*50)
-    print(f"🛠️ ENTERING TOOLS NODE (Executing {len(state['tool_calls'])} calls)")
-    print("#"*50)
+    logger.info("🛠️ ENTERING TOOLS NODE (Executing %s calls)", len(state['tool_calls']))
     
     tool_calls = state["tool_calls"]
     tool_results = []
@@ -158,7 +228,7 @@ def tool_execution_node(state: JQLAnalysisState) -> JQLAnalysisState:
 
         result = ""
         
-        print(f"   * EXECUTING: {tool_name}({tool_args})")
+        logger.info("* EXECUTING: %s(%s)", tool_name, tool_args)
         
         if tool_name not in tools_map:
             result = f"Error: Tool {tool_name} not found."
@@ -167,14 +237,14 @@ def tool_execution_node(state: JQLAnalysisState) -> JQLAnalysisState:
                 # Execute the corresponding function (e.g., get_all_projects())
                 tool_function = tools_map[tool_name]
                 
-                # We assume the tools take no arguments based on your current setup.
-                output = tool_function(**tool_args)
+                # Invoke through the tool interface so the call shows up as tool events
+                output = tool_function.invoke(tool_args, config)
                 result = str(output) # Convert list/dict output to a string for the LLM
                 
             except Exception as e:
                 result = f"Tool execution failed: {e}"
 
-            print(f"   * RESULT COLLECTED (Length: {len(result)}).")
+            logger.debug("* RESULT COLLECTED (Length: %s).", len(result))
 
         # Store the result for the agent to use in the next loop
         tool_results.append(ToolResult(
@@ -182,17 +252,96 @@ def tool_execution_node(state: JQLAnalysisState) -> JQLAnalysisState:
             content=result
         ))
 
-    print("#"*50)
-    print("↩️ TOOLS EXECUTION COMPLETE. Moving back to 'agent' node.")
-    print("#"*50)
+    logger.info("↩️ TOOLS EXECUTION COMPLETE. Moving back to 'agent' node.")
         
     return {
         "tool_results": tool_results,
         "tool_calls": [], # Clear tool_calls to signal the action is complete
-        "validation_status": "TOOLS_EXECUTED"
+        "validation_status": "TOOLS_EXECUTED",
+        "steps": state.get("steps", 0) + 1,
+        "tool_call_count": state.get("tool_call_count", 0) + len(tool_calls)
+    }
+
+
+def validation_node(state: JQLAnalysisState) -> JQLAnalysisState:
+    '''
+    Checks the candidate JQL against Jira (parse check plus a maxResults=0 count).
+    Valid queries become final_jql, with the result count and the suggested fetch mode.
+    Invalid ones are sent back to the agent with the error, up to MAX_VALIDATION_ATTEMPTS.
+    '''
+    jql = state.get("suggested_jql")
+    attempts = state.get("validation_attempts", 0) + 1
+    steps = state.get("steps", 0) + 1
+
+    logger.info("🔎 VALIDATING JQL (attempt %s/%s): %s", attempts, MAX_VALIDATION_ATTEMPTS, jql)
+    validation = jira_client.validate_jql(jql)
+
+    if validation["valid"]:
+        count = validation["count"]
+        fetch_mode = "bulk" if count is not None and count <= BULK_FETCH_MAX_RESULTS else "paginated"
+        logger.info("✅ JQL VALID: %s results. Suggested fetch mode: %s", count, fetch_mode)
+        return {
+            "final_jql": jql,
+            "validation_status": "VALID",
+            "validation_error": None,
+            "validation_attempts": attempts,
+            "result_count": count,
+            "fetch_mode": fetch_mode,
+            "steps": steps
+        }
+
+    logger.warning("❌ JQL REJECTED: %s", validation['error'])
+    return {
+        "final_jql": None,
+        "validation_status": "INVALID" if attempts < MAX_VALIDATION_ATTEMPTS else "FAILED",
+        "validation_error": validation["error"],
+        "validation_attempts": attempts,
+        "result_count": None,
+        "fetch_mode": None,
+        "steps": steps
     }
 
 
+def fallback_node(state: JQLAnalysisState) -> JQLAnalysisState:
+    '''
+    Deterministic exit when the run exceeds its budget: returns the last candidate JQL
+    (unvalidated) if there is one, or a structured error otherwise.
+    '''
+    exceeded = budget_exceeded(state, len(state.get("tool_calls") or [])) or {"reason": "unknown"}
+    jql = state.get("suggested_jql")
+
+    logger.warning(
+        "⛔ BUDGET EXCEEDED (%s). LLM calls: %s, tool calls: %s, steps: %s",
+        exceeded["reason"], state.get("llm_calls", 0), state.get("tool_call_count", 0), state.get("steps", 0)
+    )
+
+    return {
+        "final_jql": jql,
+        "tool_calls": [],
+        "validation_status": "BUDGET_EXCEEDED",
+        "error": {
+            **exceeded,
+            "message": "Returning the last candidate JQL without validation" if jql else "No JQL was generated"
+        }
+    }
+
+
+def route_after_agent(state: JQLAnalysisState) -> str:
+    if state.get("tool_calls"):
+        return "fallback" if budget_exceeded(state, len(state["tool_calls"])) else "tools"
+    return "validate"
+
+
+def route_after_tools(state: JQLAnalysisState) -> str:
+    return "fallback" if budget_exceeded(state) else "agent"
+
+
+def route_after_validation(state: JQLAnalysisState) -> str:
+    if state.get("validation_status") != "INVALID":
+        return "end"
+    return "fallback" if budget_exceeded(state) else "agent"
+
+
 # Assume agent_node and tool_execution_node are defined using the agent pattern
 
 # 1. Initialize the builder
@@ -201,6 +350,8 @@ workflow = StateGraph(JQLAnalysisState)
 # 2. Add the nodes
 workflow.add_node("agent", agent_node) # The LLM decision-maker
 workflow.add_node("tools", tool_execution_node) # Executes JiraClient methods
+workflow.add_node("validate", validation_node) # Checks the candidate JQL against Jira
+workflow.add_node("fallback", fallback_node) # Deterministic exit when the budget runs out
 
 # 3. Set the entry point
 workflow.set_entry_point("agent")
@@ -210,15 +361,107 @@ workflow.add_conditional_edges(
     "agent",
     # The output from the agent_node determines the next step:
     # This function checks if the agent requested a tool call or provided the final JQL.
-    lambda state: "tools" if state.get("tool_calls") else "end",
+    route_after_agent,
+    {
+        "tools": "tools",        # If tool_calls exist, go to the tool_execution_node
+        "validate": "validate",  # Otherwise, the agent has provided a candidate JQL to validate
+        "fallback": "fallback"   # Unless the run is already over its budget
+    }
+)
+
+# 5a. Invalid JQL goes back to the agent with the error, until the attempts run out
+workflow.add_conditional_edges(
+    "validate",
+    route_after_validation,
     {
-        "tools": "tools", # If tool_calls exist, go to the tool_execution_node
-        "end": END        # Otherwise, the agent has provided the final JQL (or failed), so end.
+        "agent": "agent",
+        "fallback": "fallback",
+        "end": END
     }
 )
 
-# 5. Tool Execution must always return control to the agent to decide the next step
-workflow.add_edge("tools", "agent")
+# 5. Tool Execution returns control to the agent to decide the next step (within budget)
+workflow.add_conditional_edges(
+    "tools",
+    route_after_tools,
+    {
+        "agent": "agent",
+        "fallback": "fallback"
+    }
+)
+workflow.add_edge("fallback", END)
+
+# 6. Compile the graph. The recursion limit is a hard backstop on top of the step budget
+RECURSION_LIMIT = int(os.getenv("AGENT_RECURSION_LIMIT", str(max(25, MAX_STEPS * 2 + 5))))
+reactive_jql_app = workflow.compile().with_config(recursion_limit=RECURSION_LIMIT)
+
+
+def create_initial_state(user_prompt: str) -> JQLAnalysisState:
+    '''Returns the initial graph state for a natural language request.'''
+    return {
+        "user_prompt": user_prompt,
+        "suggested_jql": None,
+        "tool_calls": [],
+        "tool_results": [],
+        "validation_status": None,
+        "final_jql": None,
+        "validation_error": None,
+        "validation_attempts": 0,
+        "result_count": None,
+        "fetch_mode": None,
+        "started_at": None,
+        "steps": 0,
+        "llm_calls": 0,
+        "tool_call_count": 0,
+        "error": None
+    }
+
+
+GRAPH_NODES = ("agent", "tools", "validate", "fallback")
+
+
+async def astream_jql_events(user_prompt: str) -> AsyncIterator[dict]:
+    '''
+    Runs the NL-to-JQL graph and yields structured progress events as they happen:
+
+    - {"type": "node_start" | "node_end", "node", "elapsed"}
+    - {"type": "tool_start" | "tool_end", "tool", "args" | "duration", "elapsed"}
+    - {"type": "token", "text", "elapsed"} for partial LLM output
+    - {"type": "final", "state", "elapsed"} once the graph finishes
+
+    Times are in seconds since the start of the run.
+    '''
+    start = time.perf_counter()
+    tool_started = {}
+    final_state = None
+
+    async for event in reactive_jql_app.astream_events(create_initial_state(user_prompt), version="v2"):
+        kind = event["event"]
+        name = event.get("name")
+        elapsed = round(time.perf_counter() - start, 3)
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        if kind in ("on_chain_start", "on_chain_end") and name in GRAPH_NODES and node == name:
+            yield {"type": "node_start" if kind == "on_chain_start" else "node_end", "node": name, "elapsed": elapsed}
+
+        elif kind == "on_tool_start":
+            tool_started[event["run_id"]] = time.perf_counter()
+            yield {"type": "tool_start", "tool": name, "args": event["data"].get("input"), "elapsed": elapsed}
+
+        elif kind == "on_tool_end":
+            duration = time.perf_counter() - tool_started.pop(event["run_id"], time.perf_counter())
+            yield {"type": "tool_end", "tool": name, "duration": round(duration, 3), "elapsed": elapsed}
+
+        elif kind == "on_chat_model_stream":
+            content = event["data"]["chunk"].content
+            if isinstance(content, list):
+                content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+            text = content or ""
+            if text:
+                yield {"type": "token", "text": text, "elapsed": elapsed}
+
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            # The outermost run is the graph itself: its output is the final state
+            final_state = event["data"].get("output")
 
-# 6. Compile the graph
-reactive_jql_app = workflow.compile()
\ No newline at end of file
+    yield {"type": "final", "state": final_state, "elapsed": round(time.perf_counter() - start, 3)}
@@ -1,10 +1,21 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 import os
+import asyncio
+import inspect
+import time
+import statistics
+from collections import deque
 from datetime import datetime
+import httpx
+from log_config import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+
 class LLMClient:
 
     _instance = None
@@ -14,40 +25,71 @@ class LLMClient:
             cls._instance = super(LLMClient, cls).__new__(cls)
             cls._instance._init_client()
         return cls._instance
-    
+
     def _init_client(self):
 
-        # Obtener configuración desde variables de entorno
-        api_key = os.getenv("LLM_API_KEY")
-        api_base_url = os.getenv("LLM_API_BASE_URL")
+        # Obtener configuración desde variables de entorno. Las variables OPENAI_COMPAT_* son
+        # propias de este backend; las LLM_* compartidas sólo se usan si no están definidas
+        self.api_key = os.getenv("OPENAI_COMPAT_API_KEY") or os.getenv("LLM_API_KEY")
+        self.api_base_url = os.getenv("OPENAI_COMPAT_BASE_URL") or os.getenv("LLM_API_BASE_URL")
+        self.model = os.getenv("OPENAI_COMPAT_MODEL") or os.getenv("LLM_MODEL", "deepseek-chat")
 
         # Initializar cliente de LLM
         self.client = OpenAI(
-            api_key=api_key,
-            base_url=api_base_url,
+            api_key=self.api_key,
+            base_url=self.api_base_url,
         )
 
-    def generate_text(self, prompt: str) -> str:
+        # Configuración del cliente asíncrono: concurrencia máxima, pool HTTP y timeout
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "5"))
+        self.pool_size = int(os.getenv("LLM_HTTP_POOL_SIZE", str(self.max_concurrency * 2)))
+        self.timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+        # El cliente asíncrono y el semáforo quedan ligados a un event loop, por lo que
+        # se crean al primer uso dentro de cada loop
+        self._async_loop = None
+        self.async_client = None
+        self._semaphore = None
+
+        # Métricas de las últimas llamadas asíncronas (tiempo al primer token, duración)
+        self.metrics = deque(maxlen=int(os.getenv("LLM_METRICS_WINDOW", "1000")))
+
+    def _build_messages(self, prompt: str, system_prompt: str) -> list:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+
+    def generate_text(self, prompt: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT, **kwargs) -> str:
         '''
         Método para generar texto usando el modelo LLM
+
+        Los parámetros adicionales (por ejemplo, response_format) se pasan tal cual a la API.
+        '''
+        return self.generate_chat(self._build_messages(prompt, system_prompt), **kwargs)
+
+
+    def generate_chat(self, messages: list, **kwargs) -> str:
+        '''
+        Método para generar texto a partir de una lista de mensajes de chat ({"role", "content"}),
+        por ejemplo un prompt con varios mensajes de sistema y de usuario
         '''
 
         # Obtener modelo desde configuración
-        model = os.getenv("LLM_MODEL", "deepseek-chat")
+        model = self.model
 
         # Medir tiempo de inicio
         start_time = datetime.now()
 
         # Informar que comienza la generación
-        print(f"Generando texto con el modelo {model}...")
-        
+        logger.debug("Generando texto con el modelo %s...", model)
+
         # Obtener completion
         response = self.client.chat.completions.create(
-            model=model, 
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ]
+            model=model,
+            messages=messages,
+            **kwargs
         )
 
         # Medir tiempo de fin
@@ -57,7 +99,149 @@ class LLMClient:
         duration = (end_time - start_time).total_seconds()
 
         # Entregar feedback al usuario
-        print(f"Respuesta generada en {duration} segundos.")
+        logger.debug("Respuesta generada en %s segundos.", duration)
 
         # Retornar el texto generado
-        return response.choices[0].message.content
\ No newline at end of file
+        return response.choices[0].message.content
+
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        '''
+        Método que entrega el cliente asíncrono del loop actual. Todas las llamadas del loop
+        comparten un único pool de conexiones HTTP y el mismo semáforo de concurrencia.
+        El cliente vive lo que dura la ejecución: se debe cerrar con aclose antes de que
+        termine su loop.
+        '''
+        loop = asyncio.get_running_loop()
+
+        if self._async_loop is not loop:
+            # Un cliente de otro loop no se puede cerrar desde éste: sus conexiones ya no sirven
+            if self.async_client is not None:
+                logger.warning("El cliente asíncrono del loop anterior no se cerró con aclose; se reemplaza.")
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size
+                ),
+                timeout=self.timeout
+            )
+            self.async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.api_base_url,
+                http_client=http_client
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._async_loop = loop
+
+        return self.async_client
+
+
+    async def agenerate(
+            self,
+            prompt: str,
+            system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+            on_token=None,
+            **kwargs) -> str:
+        '''
+        Método asíncrono para generar texto en streaming.
+
+        Respeta la concurrencia máxima configurada. Si se entrega on_token (función normal
+        o asíncrona), se llama con cada fragmento de texto apenas llega. Los parámetros
+        adicionales (por ejemplo, response_format) se pasan tal cual a la API.
+        '''
+        return await self.agenerate_chat(self._build_messages(prompt, system_prompt), on_token=on_token, **kwargs)
+
+
+    async def agenerate_chat(self, messages: list, on_token=None, **kwargs) -> str:
+        '''
+        Método asíncrono para generar texto en streaming a partir de una lista de mensajes de
+        chat ({"role", "content"}). Igual que agenerate en lo demás.
+        '''
+
+        # Obtener modelo desde configuración
+        model = kwargs.pop("model", None) or self.model
+
+        client = self._get_async_client()
+
+        async with self._semaphore:
+            start = time.perf_counter()
+            first_token_at = None
+            chunks = []
+
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                **kwargs
+            )
+
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+
+                # Registrar el tiempo al primer token
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+
+                chunks.append(token)
+
+                if on_token is not None:
+                    callback_result = on_token(token)
+                    if inspect.isawaitable(callback_result):
+                        await callback_result
+
+            end = time.perf_counter()
+
+        # Guardar métricas de la llamada
+        self.metrics.append({
+            "model": model,
+            "ttft": (first_token_at - start) if first_token_at else None,
+            "duration": end - start,
+            "chars": sum(len(c) for c in chunks)
+        })
+
+        return "".join(chunks)
+
+
+    async def agenerate_many(self, prompts: list, return_exceptions: bool = False, **kwargs) -> list:
+        '''
+        Método asíncrono para generar texto para varios prompts en paralelo, acotado por la
+        concurrencia máxima. Retorna las respuestas en el mismo orden de los prompts.
+        '''
+        return await asyncio.gather(
+            *[self.agenerate(prompt, **kwargs) for prompt in prompts],
+            return_exceptions=return_exceptions
+        )
+
+
+    def get_metrics_summary(self) -> dict:
+        '''
+        Método que resume las métricas de las últimas llamadas asíncronas: cantidad,
+        tiempo al primer token (promedio y p95) y duración promedio, en segundos.
+        '''
+        ttfts = sorted(m["ttft"] for m in self.metrics if m["ttft"] is not None)
+        durations = [m["duration"] for m in self.metrics]
+
+        return {
+            "calls": len(self.metrics),
+            "ttft_mean": statistics.fmean(ttfts) if ttfts else None,
+            "ttft_p95": ttfts[int(0.95 * (len(ttfts) - 1))] if ttfts else None,
+            "duration_mean": statistics.fmean(durations) if durations else None
+        }
+
+
+    async def aclose(self) -> None:
+        '''
+        Método para cerrar el pool de conexiones del cliente asíncrono. Se llama al terminar
+        la ejecución, dentro del mismo loop en que se usó el cliente.
+        '''
+        if self.async_client is not None:
+            await self.async_client.close()
+            self.async_client = None
+            self._semaphore = None
+            self._async_loop = None
@@ -0,0 +1,321 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List
+from dotenv import load_dotenv
+from langchain_core.runnables import Runnable
+from pydantic import ValidationError
+from llm_client import LLMClient
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Rol de la API de chat para cada tipo de mensaje de LangChain
+CHAT_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+def is_throttling_error(error: Exception) -> bool:
+    '''
+    Indica si un error corresponde a limitación de tasa del proveedor (HTTP 429 o equivalente).
+    '''
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status == 429:
+        return True
+
+    name = type(error).__name__
+    return "RateLimit" in name or "ResourceExhausted" in name or "429" in str(error)
+
+
+class BackendStats:
+    '''
+    Ventana móvil de latencias y errores de un backend, usada para ordenar los backends.
+    '''
+
+    def __init__(self, window: int):
+        self.calls = deque(maxlen=window)
+        self.throttled_until = 0.0
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.calls.append((latency, ok))
+
+    def is_throttled(self) -> bool:
+        return time.monotonic() < self.throttled_until
+
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+
+    def mean_latency(self) -> float:
+        # Incluye las llamadas fallidas: un backend que tarda en fallar también es lento
+        if not self.calls:
+            return 0.0
+        return sum(latency for latency, _ in self.calls) / len(self.calls)
+
+    def score(self) -> float:
+        # Menor es mejor. Sin historial el puntaje es 0, para que el backend se pruebe. Si sólo
+        # tiene fallas, queda último aunque fallar sea rápido (sólo se usa al conmutar por falla)
+        if self.calls and not any(ok for _, ok in self.calls):
+            return float("inf")
+        return self.mean_latency() * (1 + 4 * self.error_rate())
+
+    def summary(self) -> dict:
+        return {
+            "calls": len(self.calls),
+            "error_rate": self.error_rate(),
+            "mean_latency": self.mean_latency(),
+            "throttled": self.is_throttled()
+        }
+
+
+class LLMRouter(Runnable):
+    '''
+    Runnable que reparte las llamadas entre varios backends de LLM configurados.
+
+    Cada llamada va al backend más sano y rápido según una ventana móvil de latencias y
+    errores. Si el backend falla se intenta con el siguiente, y si responde con limitación
+    de tasa queda fuera de la rotación por un tiempo. En ejecución asíncrona, si el primer
+    intento tarda más que hedge_delay, se lanza un segundo intento en el siguiente backend
+    y se usa la primera respuesta exitosa.
+    '''
+
+    def __init__(
+            self,
+            backends: Dict[str, Runnable],
+            window: int = None,
+            hedge_delay: float = None,
+            throttle_cooldown: float = None):
+        self.backends = backends
+        self.window = window or int(os.getenv("LLM_ROUTER_WINDOW", "50"))
+        self.hedge_delay = hedge_delay if hedge_delay is not None else float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "0"))
+        self.throttle_cooldown = throttle_cooldown or float(os.getenv("LLM_THROTTLE_COOLDOWN_SECONDS", "30"))
+
+        self.stats = {name: BackendStats(self.window) for name in backends}
+        self._lock = threading.Lock()
+
+
+    def ranked_backends(self) -> List[str]:
+        '''
+        Método que entrega los nombres de backend ordenados del mejor al peor. Los backends
+        con limitación de tasa activa quedan al final.
+        '''
+        with self._lock:
+            return sorted(
+                self.backends,
+                key=lambda name: (self.stats[name].is_throttled(), self.stats[name].score())
+            )
+
+
+    def get_backend_stats(self) -> dict:
+        '''
+        Método que entrega el estado de cada backend (llamadas, tasa de error, latencia media)
+        '''
+        with self._lock:
+            return {name: stats.summary() for name, stats in self.stats.items()}
+
+
+    def _record(self, name: str, latency: float, error: Exception = None) -> None:
+        with self._lock:
+            stats = self.stats[name]
+            stats.record(latency, error is None)
+
+            if error is not None and is_throttling_error(error):
+                stats.throttled_until = time.monotonic() + self.throttle_cooldown
+                logger.warning("Backend %s con limitación de tasa. Fuera de rotación por %s segundos", name, self.throttle_cooldown)
+
+
+    def invoke(self, input, config=None, **kwargs):
+        # En modo síncrono no hay intentos en paralelo: sólo conmutación por falla
+        last_error = None
+
+        for name in self.ranked_backends():
+            start = time.perf_counter()
+            try:
+                result = self.backends[name].invoke(input, config, **kwargs)
+            except Exception as e:
+                self._record(name, time.perf_counter() - start, e)
+                logger.warning("Falla en backend %s: %s. Intentando con el siguiente...", name, e)
+                last_error = e
+                continue
+
+            self._record(name, time.perf_counter() - start)
+            return result
+
+        raise last_error or RuntimeError("No hay backends de LLM configurados")
+
+
+    async def _acall(self, name: str, input, config, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await self.backends[name].ainvoke(input, config, **kwargs)
+        except asyncio.CancelledError:
+            # Intento descartado porque otro respondió antes. No cuenta como error, pero su
+            # tiempo se registra como latencia (al menos tardó eso), para que el backend lento
+            # no conserve el puntaje de "sin historial" y siga primero en el orden
+            self._record(name, time.perf_counter() - start)
+            raise
+        except Exception as e:
+            self._record(name, time.perf_counter() - start, e)
+            raise
+
+        self._record(name, time.perf_counter() - start)
+        return result
+
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        candidates = iter(self.ranked_backends())
+        running = {}
+        last_error = None
+
+        def launch() -> bool:
+            name = next(candidates, None)
+            if name is None:
+                return False
+            task = asyncio.ensure_future(self._acall(name, input, config, **kwargs))
+            running[task] = name
+            return True
+
+        if not launch():
+            raise RuntimeError("No hay backends de LLM configurados")
+
+        try:
+            while running:
+                # Esperar la primera respuesta. Si hay un solo intento en curso y está habilitado
+                # el hedging, esperar sólo hedge_delay antes de lanzar un segundo intento
+                hedge = self.hedge_delay > 0 and len(running) == 1
+                done, _ = await asyncio.wait(
+                    running.keys(),
+                    timeout=self.hedge_delay if hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    if launch():
+                        logger.warning("Respuesta lenta de %s. Lanzando intento paralelo...", next(iter(running.values())))
+                    else:
+                        # No quedan backends: seguir esperando sin hedging
+                        done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+
+                    last_error = task.exception()
+                    logger.warning("Falla en backend %s: %s. Intentando con el siguiente...", name, last_error)
+
+                # Conmutar al siguiente backend si no queda ningún intento en curso
+                if not running:
+                    launch()
+
+        finally:
+            for task in running:
+                task.cancel()
+
+        raise last_error
+
+
+class FakeLLMBackend(Runnable):
+    '''
+    Backend local para pruebas, sin llamadas de red. Entrega la respuesta de responder(input, config)
+    después de una latencia simulada, y falla con la probabilidad indicada.
+    '''
+
+    def __init__(self, responder, latency: float = 0.0, failure_rate: float = 0.0, seed: int = None):
+        self.responder = responder
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    def _maybe_fail(self):
+        if self._random.random() < self.failure_rate:
+            raise RuntimeError("Falla simulada del backend de prueba")
+
+    def invoke(self, input, config=None, **kwargs):
+        time.sleep(self.latency)
+        self._maybe_fail()
+        return self.responder(input, config)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return self.responder(input, config)
+
+
+class OpenAICompatibleBackend(Runnable):
+    '''
+    Backend de salida estructurada sobre LLMClient (API compatible con OpenAI, por ejemplo DeepSeek).
+
+    Pide la respuesta en modo JSON según el esquema del modelo pydantic y entrega la misma forma
+    que with_structured_output(..., include_raw=True): {"raw", "parsed", "parsing_error"}.
+    Si se entrega rate_limiter (el mismo de los demás backends), cada llamada espera su turno.
+    '''
+
+    def __init__(self, schema, rate_limiter=None):
+        self.schema = schema
+        self.rate_limiter = rate_limiter
+        self.client = LLMClient()
+        self.system_prompt = (
+            "Responde únicamente con un objeto JSON válido que cumpla este esquema:\n"
+            + json.dumps(schema.model_json_schema(), ensure_ascii=False)
+        )
+
+    def _messages(self, input) -> list:
+        '''
+        Convierte el prompt en mensajes de chat. Las instrucciones del esquema, iguales en todas
+        las llamadas, van al inicio del mensaje de sistema, seguidas del prefijo de la épica,
+        para que el proveedor pueda reutilizar el prefijo común desde su caché
+        '''
+        if hasattr(input, "to_messages"):
+            messages = input.to_messages()
+        elif isinstance(input, list):
+            messages = input
+        else:
+            return [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": str(input)}
+            ]
+
+        system = [m.content for m in messages if m.type == "system"]
+        chat = [
+            {"role": CHAT_ROLES.get(m.type, "user"), "content": m.content}
+            for m in messages if m.type != "system"
+        ]
+        return [{"role": "system", "content": "\n\n".join([self.system_prompt, *system])}] + chat
+
+    def _parse(self, content: str) -> dict:
+        try:
+            raw = json.loads(content)
+        except json.JSONDecodeError as e:
+            return {"raw": content, "parsed": None, "parsing_error": e}
+
+        try:
+            return {"raw": raw, "parsed": self.schema.model_validate(raw), "parsing_error": None}
+        except ValidationError as e:
+            return {"raw": raw, "parsed": None, "parsing_error": e}
+
+    def invoke(self, input, config=None, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        content = self.client.generate_chat(
+            self._messages(input),
+            response_format={"type": "json_object"}
+        )
+        return self._parse(content)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire()
+
+        content = await self.client.agenerate_chat(
+            self._messages(input),
+            response_format={"type": "json_object"}
+        )
+        return self._parse(content)
@@ -0,0 +1,173 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from dotenv import load_dotenv
+from jira_client import IssueInfo
+from text_preprocessor import estimate_tokens
+from log_config import get_logger, correlation
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Llamadas al LLM en paralelo si no se define ANALYSIS_MAX_CONCURRENCY
+DEFAULT_ANALYSIS_MAX_CONCURRENCY = 5
+
+# Claves de prioridad soportadas en LLM_PRIORITY_KEYS
+PRIORITY_KEYS = (
+    "resolution_date_desc", "resolution_date_asc",
+    "size_asc", "size_desc",
+    "epic"
+)
+
+
+def get_analysis_max_concurrency() -> int:
+    '''
+    Cantidad máxima de llamadas al LLM en paralelo (ANALYSIS_MAX_CONCURRENCY). También
+    dimensiona el pool de conexiones a Jira y el limitador de tasa
+    '''
+    return int(os.getenv("ANALYSIS_MAX_CONCURRENCY", str(DEFAULT_ANALYSIS_MAX_CONCURRENCY)))
+
+
+def parse_resolution_date(value: str) -> Optional[float]:
+    '''
+    Convierte la fecha de resolución de Jira (ISO, por ejemplo 2024-05-02T10:15:00.000-0400)
+    a timestamp. Retorna None si el issue no tiene fecha válida.
+    '''
+    if not value or not value[:4].isdigit():
+        return None
+
+    for parse in (
+        lambda v: datetime.strptime(v, "%Y-%m-%dT%H:%M:%S.%f%z"),
+        datetime.fromisoformat
+    ):
+        try:
+            return parse(value).timestamp()
+        except ValueError:
+            continue
+
+    return None
+
+
+def estimate_issue_tokens(issue: IssueInfo) -> int:
+    '''
+    Tamaño estimado del prompt de un issue (datos del issue y documento de la épica)
+    '''
+    return (
+        estimate_tokens(issue.summary or "")
+        + estimate_tokens(issue.description or "")
+        + estimate_tokens(issue.business_info or "")
+    )
+
+
+class LLMScheduler:
+    '''
+    Planificador de las llamadas al LLM por prioridad.
+
+    La prioridad de cada issue se arma con las claves de LLM_PRIORITY_KEYS, en orden (por
+    ejemplo "resolution_date_desc,size_asc,epic": primero lo resuelto más recientemente,
+    luego lo más corto, y agrupado por épica). Un grupo de trabajadores toma siempre el
+    issue pendiente de mayor prioridad, con a lo sumo max_concurrency llamadas en curso;
+    los límites de tasa del LLM siguen aplicando dentro de cada llamada.
+    '''
+
+    def __init__(self, keys: List[str] = None, max_concurrency: int = None):
+        if keys is None:
+            keys = [k.strip().lower() for k in os.getenv("LLM_PRIORITY_KEYS", "").split(",") if k.strip()]
+
+        unknown = [k for k in keys if k not in PRIORITY_KEYS]
+        if unknown:
+            logger.warning("Claves de prioridad desconocidas (se ignoran): %s", unknown)
+
+        self.keys = [k for k in keys if k in PRIORITY_KEYS]
+        self.max_concurrency = max_concurrency or get_analysis_max_concurrency()
+
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.keys)
+
+
+    def priority(self, issue: IssueInfo, index: int) -> tuple:
+        '''
+        Método que entrega la prioridad de un issue (menor es antes). Los valores faltantes
+        quedan al final y el índice de entrada desempata.
+        '''
+        parts = []
+
+        for key in self.keys:
+            if key.startswith("resolution_date"):
+                timestamp = parse_resolution_date(issue.resolution_date)
+                if timestamp is None:
+                    parts.append((1, 0.0))
+                else:
+                    parts.append((0, -timestamp if key.endswith("desc") else timestamp))
+            elif key.startswith("size"):
+                tokens = estimate_issue_tokens(issue)
+                parts.append((0, -tokens if key.endswith("desc") else tokens))
+            elif key == "epic":
+                parts.append((0 if issue.epic_key else 1, issue.epic_key or ""))
+
+        return (*parts, index)
+
+
+    def order(self, issues: List[IssueInfo]) -> List[int]:
+        '''
+        Método que entrega los índices de los issues en el orden en que deben analizarse
+        '''
+        if not self.enabled:
+            return list(range(len(issues)))
+
+        return sorted(range(len(issues)), key=lambda index: self.priority(issues[index], index))
+
+
+    def schedule(self, issues: List[IssueInfo]) -> List[IssueInfo]:
+        '''
+        Método que entrega los issues en el orden en que deben analizarse. Con ese orden como
+        entrada, la tabla de salida sigue la prioridad y los resultados llegan casi en orden,
+        sin que el buffer de orden tenga que retener muchos.
+        '''
+        if not self.enabled:
+            return issues
+
+        return [issues[index] for index in self.order(issues)]
+
+
+    async def run(self, runnable, issues: List[IssueInfo], inputs: list, configs: list) -> list:
+        '''
+        Método que ejecuta el runnable sobre todas las entradas por orden de prioridad (sin
+        claves de prioridad, en el orden de entrada).
+
+        Retorna los resultados en el orden de entrada; las fallas se entregan como la
+        excepción correspondiente (como abatch con return_exceptions=True).
+        '''
+        queue = asyncio.PriorityQueue()
+        for index, issue in enumerate(issues):
+            queue.put_nowait((self.priority(issue, index), index))
+
+        results = [None] * len(inputs)
+
+        async def worker():
+            while True:
+                try:
+                    _, index = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                # La cadena copia el contexto al invocarse, así que todos sus pasos ven la
+                # clave del issue como identificador de correlación
+                with correlation(issues[index].key):
+                    try:
+                        results[index] = await runnable.ainvoke(inputs[index], configs[index])
+                    except Exception as e:
+                        results[index] = e
+
+        workers = min(self.max_concurrency, len(inputs))
+        logger.info(
+            "Analizando %s issues por prioridad (%s) con %s llamadas en paralelo",
+            len(inputs), ",".join(self.keys) or "orden de entrada", workers
+        )
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+        return results
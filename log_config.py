@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Identificador de correlación del trabajo en curso (por ejemplo, la clave del issue).
+# Al ser una variable de contexto, cada tarea asíncrona o hilo de la cadena ve el suyo
+correlation_id: ContextVar[str] = ContextVar("correlation_id", default="-")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s [%(correlation_id)s] %(message)s"
+
+_listener = None
+
+
+class CorrelationFilter(logging.Filter):
+    '''
+    Agrega el identificador de correlación del contexto actual a cada registro
+    '''
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    '''
+    Formato JSON de una línea por registro, para el pipeline de logs
+    '''
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "message": record.getMessage(),
+            "process": record.process
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging() -> None:
+    '''
+    Configura el logging de la aplicación una sola vez por proceso.
+
+    Los registros pasan por una cola (QueueHandler) y un hilo aparte (QueueListener) los
+    formatea y escribe, para que las tareas concurrentes no se bloqueen escribiendo en la
+    consola. Se controla con LOG_LEVEL (INFO por defecto), LOG_FORMAT ("text" o "json")
+    y LOG_FILE (opcional, además de la consola).
+    '''
+    global _listener
+    if _listener is not None:
+        return
+
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    formatter = JsonFormatter() if os.getenv("LOG_FORMAT", "text").lower() == "json" else logging.Formatter(TEXT_FORMAT)
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if os.getenv("LOG_FILE"):
+        handlers.append(logging.FileHandler(os.getenv("LOG_FILE"), encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers = [queue_handler]
+
+    # Las librerías (HTTP, LangChain) sólo informan advertencias, salvo en DEBUG
+    if level != "DEBUG":
+        for name in ("urllib3", "httpx", "httpcore", "langchain", "google", "openai"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    '''
+    Vacía la cola de registros pendientes y detiene el hilo de escritura
+    '''
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    '''
+    Entrega el logger del módulo, configurando el logging si aún no se hizo
+    '''
+    setup_logging()
+    return logging.getLogger(name)
+
+
+@contextmanager
+def correlation(value: str):
+    '''
+    Fija el identificador de correlación dentro de un bloque
+    '''
+    token = correlation_id.set(value or "-")
+    try:
+        yield
+    finally:
+        correlation_id.reset(token)
+
@@ -3,66 +3,176 @@ from dotenv import load_dotenv
 from jira import JIRA
 from datetime import datetime
 from jira_client import JiraClient, IssueInfo, IssueAnalysis
-from typing import List
+from typing import List, Dict
 from llm_client import LLMClient
 from business_info import BusinessInfo
 from output_manager import OutputManager, OutputRunnable
+from impact_repair import ImpactRepairRunnable, MetricImpactList
+from llm_router import LLMRouter, FakeLLMBackend, OpenAICompatibleBackend
+from text_preprocessor import TextPreprocessor
+from prompt_cache import EpicContextCache, EpicContextCacheRunnable
+from issue_dedup import deduplicate_issues
+from run_planner import plan_run, print_plan
+from llm_scheduler import LLMScheduler, get_analysis_max_concurrency
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from langchain_google_genai import ChatGoogleGenerativeAI
-from pydantic import BaseModel
 import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from log_config import get_logger, correlation
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 JIRA_SERVER = os.getenv("JIRA_SERVER")
 JIRA_USER = os.getenv("JIRA_USER")
 JIRA_TOKEN = os.getenv("JIRA_API_TOKEN")
 FILTER_ID = os.getenv("JIRA_FILTER_ID")
 EXECUTION = os.getenv("EXECUTION")
+ANALYSIS_MAX_CONCURRENCY = get_analysis_max_concurrency()
+
+
+# Prompt de análisis, común a todos los modos de ejecución. Se divide en un prefijo estable
+# (instrucciones y documento de la épica, igual para todos los issues de una épica) y un sufijo
+# con los datos de cada issue, para que el prefijo se pueda reutilizar desde el caché del proveedor
+ANALYSIS_SYSTEM_TEMPLATE = """
+    Eres un asistente que resume información de issues de Jira para reportes de negocio.
+
+    Para cada issue que se te entregue, genera una respuesta estructurada con los siguientes campos:
+
+    1. "resumen": descripción breve (máximo 10 palabras) que explica de qué se trata el issue.
+    2. "valor_negocio": resumen (máximo 25 palabras) del valor de negocio aportado por la HU, usando únicamente la sección de "objetivos de la iniciativa" del documento.
+    3. "metrica_impactada": nombre de la métrica más impactada por la HU, sin explicaciones adicionales.
+    4. "impactos": una lista con un elemento por cada métrica definida en la sección correspondiente, con los campos "metrica" (nombre de la métrica), "nivel" ("Nulo", "Bajo", "Medio" o "Alto") y "justificacion" (justificación del nivel asignado).
+    5. "issue_key": la clave de identificación del issue de Jira (por ejemplo, "SVA-1000").
+    6. "epic_key": la clave de identificación de la épica a la que pertenece el issue (por ejemplo: GOBI-800).
+    7. "resolution_date": la fecha en la que se resolvió el issue, expresada en formato MM-DD
+
+    Épica del issue: {epic_key} - {epic_summary}
+
+    Documento de valor de negocio de la épica:
+    {business_info}
+    """
+
+ANALYSIS_ISSUE_TEMPLATE = """
+    Analiza los siguientes datos de un issue:
+    - Clave del issue: {key}
+    - Fecha de resolución: {resolution_date}
+    - Resumen original: {summary}
+    - Descripción: {description}
+    """
 
 
 def main():
-    print("Everything OK!")
+    logger.info("Everything OK!")
 
     start_time = datetime.now()
 
-    # Leer filtro según el código pre definido
-    filter = os.getenv("JIRA_FILTER_ID")
+    # Leer filtros según el código pre definido. Con JIRA_FILTER_IDS (lista separada por comas)
+    # se procesan varios filtros en una sola ejecución
+    filter_ids = get_filter_ids()
+
+    # Planificar la ejecución sin llamar al LLM: tokens, llamadas y tiempo estimados
+    if EXECUTION == "dryrun":
+        print_plan(plan_run(filter_ids, ANALYSIS_SYSTEM_TEMPLATE, ANALYSIS_ISSUE_TEMPLATE))
+        return
+
+    # Buscar información de los issues de los filtros. Cada issue se lee y analiza una sola
+    # vez, aunque aparezca en varios filtros
+    membership: Dict[str, List[str]] = {}
+    issues_info = get_issue_list_info(filter_ids, membership)
 
-    # Buscar información de los issues del filtro
-    issues_info = get_issue_list_info(filter)
+    # Orden de las filas de salida (el del filtro, salvo que se pida otro)
+    issues_info = order_issues(issues_info)
 
-    # Generar la salida, pudiendo ser de forma síncrona o asíncrona
+    # Generar la salida, pudiendo ser de forma síncrona, asíncrona o particionada en procesos
     if EXECUTION == "asynch":
-        print("Ejecutaremos en forma ASÍNCRONA...")
+        logger.info("Ejecutaremos en forma ASÍNCRONA...")
         asyncio.run(create_output_table_async(issues_info))
+    elif EXECUTION == "sharded":
+        logger.info("Ejecutaremos en forma PARTICIONADA en varios procesos...")
+        create_output_table_sharded(issues_info)
     else:
         create_output_table(issues_info)
 
+    # Con varios filtros, repartir la tabla combinada en una tabla por filtro
+    if len(filter_ids) > 1:
+        OutputManager().save_tables_by_filter("output_table.csv", membership)
+
     finish_time = datetime.now()
 
     elapsed_time = (finish_time - start_time).total_seconds() / 60
- 
-    print(f"Proceso terminado en {elapsed_time}")
 
+    # Eliminar los cachés de contexto creados en el proveedor
+    EpicContextCache().clear()
+
+    # Informar los tokens ahorrados por el preprocesamiento de textos
+    TextPreprocessor().print_stats()
 
-def get_issue_list_info(filter) -> List[IssueInfo]:
+    # Informar el uso del caché de documentos de negocio
+    logger.info("Caché de documentos de negocio: %s", BusinessInfo().get_cache_stats())
+
+    logger.info("Proceso terminado en %s", elapsed_time)
+
+
+def get_filter_ids() -> List[str]:
+    '''
+    Método que entrega los filtros a procesar: JIRA_FILTER_IDS (separados por comas) o,
+    si no está definido, JIRA_FILTER_ID
+    '''
+    filter_ids = [f.strip() for f in os.getenv("JIRA_FILTER_IDS", "").split(",") if f.strip()]
+    return list(dict.fromkeys(filter_ids)) or [os.getenv("JIRA_FILTER_ID")]
+
+
+def get_issue_list_info(filter_ids: List[str], membership: Dict[str, List[str]] = None) -> List[IssueInfo]:
     '''
-    Método para obtener la información de los issues desde un filtro de Jira
+    Método para obtener la información de los issues desde uno o más filtros de Jira.
+    Si se entrega membership, se llena con las claves de los issues de cada filtro.
     '''
 
     # Instanciar cliente Jira
     jira_client = JiraClient()
-    
-    #Obtener los issues desde el filtro
-    issues = jira_client.get_issues_from_filter(filter)
-    
-    # Capturar información de cada uno de los issues
+
+    #Obtener los issues desde los filtros, página a página y sin repetir
+    issues = jira_client.iter_issues_from_filters(filter_ids, membership)
+
+    # Capturar información de cada uno de los issues. Los recursos de Jira se liberan
+    # a medida que se extraen sus campos
     info = jira_client.proccess_issue_list_info(issues)
 
+    # Cerrar el pool de extracción de adjuntos (se vuelve a crear si hace falta)
+    jira_client.attachment_resolver.close()
+
+    # Guardar los datos leídos, si se está grabando un snapshot (JIRA_SNAPSHOT_MODE=record)
+    jira_client.save_snapshot()
+
+    # Informar cuánto tardó Jira y cuántas llamadas se reintentaron
+    logger.info("Llamadas HTTP a Jira: %s", jira_client.get_http_stats())
+
     return info
 
 
+def order_issues(issues: List[IssueInfo], order: str = None) -> List[IssueInfo]:
+    '''
+    Método que ordena los issues según OUTPUT_ORDER, antes del análisis, para que la tabla
+    de salida quede en ese orden sin reordenarla al final.
+
+    "filter" (por defecto) mantiene el orden del filtro; "epic" agrupa por épica y
+    "resolution_date" ordena por fecha de resolución. Ambos son ordenamientos estables.
+    '''
+    order = (order or os.getenv("OUTPUT_ORDER", "filter")).lower()
+
+    if order == "epic":
+        return sorted(issues, key=lambda issue: issue.epic_key or "")
+    if order == "resolution_date":
+        # Los issues sin fecha quedan al final
+        return sorted(issues, key=lambda issue: (issue.resolution_date is None, issue.resolution_date or ""))
+
+    return issues
+
+
 def get_business_info() -> str:
     '''
     Método para obtener la información de negocio relativa a una HU.
@@ -88,19 +198,224 @@ def test_llm_client():
 
     # Crear el prompt a user
     prompt = "Explica como funciona la API de Jira en Python."
-    
+
     # Generar el texto
     response = llm_client.generate_text(prompt)
-    
-    # Imprimir la respuesta
-    print("LLM Response:")
-    print(response)
+
+    # Informar la respuesta
+    logger.info("LLM Response:\n%s", response)
+
+
+def create_analysis_chain(output_runnable: OutputRunnable, shard_count: int = 1):
+    '''
+    Método que construye la cadena de análisis: prompt, LLM con salida estructurada y salida.
+
+    Es común a las ejecuciones síncrona, asíncrona y particionada. En la particionada,
+    shard_count es la cantidad de procesos, que se reparten el límite de tasa del LLM.'''
+
+    # Obtener parámetros de configuración de Gemini
+    model, api_key = get_gemini_settings()
+
+    # Crear prompt desde las plantillas. Parametrizado a variables. El mensaje de sistema es
+    # el prefijo compartido por los issues de una misma épica
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", ANALYSIS_SYSTEM_TEMPLATE),
+        ("human", ANALYSIS_ISSUE_TEMPLATE)
+    ])
+
+    # Límite de llamadas por minuto al proveedor, compartido por todas las llamadas de la cadena
+    rate_limiter = create_rate_limiter(shard_count)
+
+    # El modelo de Gemini sólo se crea si está en LLM_BACKENDS (requiere su API key)
+    def create_gemini_llm(**kwargs):
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            temperature=0,
+            rate_limiter=rate_limiter,
+            **kwargs
+        )
+
+    # Con PROMPT_CACHE_MODE=explicit, el prefijo de cada épica se cachea en Gemini y los
+    # issues hermanos sólo envían su sufijo. El esquema va en la configuración de generación
+    # (json_schema), porque una llamada con caché no admite instrucciones de sistema ni herramientas
+    def create_cached_llm(handle):
+        return create_gemini_llm(cached_content=handle).with_structured_output(
+            IssueAnalysis, method="json_schema", include_raw=True
+        )
+
+    # Crear LLM con salida estructurada. Este paso es crítico.
+    # Genera un RunnableBinding que hace un wrapper de LLM comportamiento adicional
+    # (en este caso, la capacidad de manejar salida estructurada). Se conserva la respuesta
+    # cruda para poder reparar sólo los impactos inválidos, sin repetir el análisis completo.
+    # Con más de un backend configurado, un router elige a cuál enviar cada llamada
+    structured_llm = create_llm(
+        create_llm_backends(IssueAnalysis, fake_issue_analysis, create_gemini_llm, rate_limiter, create_cached_llm)
+    )
+
+    # Paso de validación y reparación de impactos. La reparación usa los mismos backends
+    # (y router) que el análisis, con el esquema de la lista de impactos
+    repair_runnable = ImpactRepairRunnable(
+        create_llm(create_llm_backends(MetricImpactList, fake_impact_repair, create_gemini_llm, rate_limiter))
+    )
+
+    # La "cadena" de ejecución. De tipo RunnableSequence
+    return prompt | structured_llm | repair_runnable | output_runnable
+
+
+def get_gemini_settings() -> tuple:
+    '''
+    Método que entrega el modelo y la API key de Gemini: GEMINI_MODEL y GEMINI_API_KEY o,
+    si no están definidas, las variables compartidas LLM_MODEL y LLM_API_KEY. Así cada
+    backend de LLM_BACKENDS tiene su propia configuración.
+    '''
+    model = os.getenv("GEMINI_MODEL") or os.getenv("LLM_MODEL", "gemini-2.5-flash")
+    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("LLM_API_KEY")
+    return model, api_key
+
+
+def create_rate_limiter(shard_count: int = 1):
+    '''
+    Método que crea el limitador de tasa del LLM según LLM_REQUESTS_PER_MINUTE.
+    Retorna None si no hay límite configurado.
+
+    El límite es global: en la ejecución particionada cada proceso tiene su propio
+    limitador, con la parte que le corresponde (el límite dividido por shard_count).
+    '''
+    requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")) / max(1, shard_count)
+    if requests_per_minute <= 0:
+        return None
+
+    return InMemoryRateLimiter(
+        requests_per_second=requests_per_minute / 60,
+        check_every_n_seconds=0.1,
+        max_bucket_size=max(1, ANALYSIS_MAX_CONCURRENCY)
+    )
+
+
+def create_llm(backends: dict):
+    '''
+    Método que entrega el backend, si hay uno solo, o un router entre los backends
+    '''
+    return next(iter(backends.values())) if len(backends) == 1 else LLMRouter(backends)
+
+
+def create_llm_backends(schema, fake_responder, create_gemini_llm, rate_limiter=None, create_cached_llm=None) -> dict:
+    '''
+    Método que crea los backends de LLM con salida estructurada según el esquema indicado,
+    según LLM_BACKENDS (lista separada por comas de "gemini", "openai" y "fake"). El orden
+    no importa: el router elige según latencia y errores observados. Todos entregan la forma
+    de with_structured_output(..., include_raw=True).
+
+    El limitador de tasa se comparte entre los backends de proveedores reales. El caché
+    explícito por épica (create_cached_llm) sólo aplica al backend de Gemini, así que se usa
+    únicamente cuando el router elige ese backend.
+    '''
+    names = [name.strip() for name in os.getenv("LLM_BACKENDS", "gemini").split(",") if name.strip()]
+
+    backends = {}
+    for name in names:
+        if name == "gemini":
+            backends[name] = create_gemini_llm().with_structured_output(schema, include_raw=True)
+            if create_cached_llm is not None:
+                backends[name] = EpicContextCacheRunnable(backends[name], create_cached_llm)
+        elif name == "openai":
+            backends[name] = OpenAICompatibleBackend(schema, rate_limiter=rate_limiter)
+        elif name == "fake":
+            backends[name] = FakeLLMBackend(
+                fake_responder,
+                latency=float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0.1")),
+                failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+            )
+        else:
+            logger.warning("Backend de LLM desconocido: %s", name)
+
+    if not backends:
+        raise ValueError("No hay backends de LLM válidos en LLM_BACKENDS")
+
+    return backends
+
+
+def fake_issue_analysis(input, config=None) -> dict:
+    '''
+    Método que genera un análisis ficticio a partir de los metadatos de la ejecución.
+    Lo usa el backend de prueba, para ejecutar el proceso completo sin llamar a un LLM.
+    '''
+    metadata = (config or {}).get("metadata", {})
+    analysis = IssueAnalysis(
+        issue_key=metadata.get("issue_key") or "FAKE-0",
+        epic_key=metadata.get("epic_key") or "FAKE-0",
+        resolution_date=(metadata.get("resolution_date") or "")[5:10],
+        resumen="Análisis de prueba",
+        valor_negocio="Análisis generado por el backend de prueba, sin LLM.",
+        metrica_impactada="Métrica de prueba",
+        impactos=[{"metrica": "Métrica de prueba", "nivel": "Medio", "justificacion": "Valor fijo de prueba"}]
+    )
+    return {"raw": None, "parsed": analysis, "parsing_error": None}
+
+
+def fake_impact_repair(input, config=None) -> dict:
+    '''
+    Método que simula la reparación de impactos en el backend de prueba: no repara ninguno,
+    por lo que los impactos inválidos se descartan.
+    '''
+    return {"raw": None, "parsed": MetricImpactList(impactos=[]), "parsing_error": None}
+
+
+def issue_to_prompt_input(issue: IssueInfo) -> dict:
+    '''
+    Método que crea la estructura de entrada, con los parámetros que espera el prompt
+    '''
+    return {
+        "key": issue.key,
+        "epic_key": issue.epic_key,
+        "epic_summary": issue.epic_summary or "",
+        "resolution_date": issue.resolution_date,
+        "summary": issue.summary,
+        "description": issue.description,
+        "business_info": issue.business_info
+    }
+
+
+def issue_to_run_config(issue: IssueInfo, index: int = None) -> dict:
+    '''
+    Método que crea la configuración de ejecución de la cadena para un issue.
+
+    Los metadatos llegan a todos los pasos de la cadena, por lo que la etapa de salida
+    puede usar los datos originales de Jira sin depender de lo que responda el LLM.
+    El índice es la posición del issue en la entrada, para escribir las filas en ese orden.
+    '''
+    return {
+        "metadata": {
+            "issue_key": issue.key,
+            "epic_key": issue.epic_key,
+            "resolution_date": issue.resolution_date,
+            "input_index": index
+        }
+    }
+
+
+def save_output_tables(output_manager: OutputManager, table_filename: str, part: int = None) -> None:
+    '''
+    Método que guarda la tabla de salida y el agregado por épica en CSV y, si están
+    configurados, confirma el almacén consolidado y guarda la salida columnar.
+    '''
+    output_manager.save_table_to_csv(table_filename)
+
+    # Agregado por épica y métrica, calculado a medida que se escribieron las filas
+    output_manager.save_rollup_to_csv("epic_rollup.csv" if part is None else f"epic_rollup_shard{part}.csv")
+
+    # Confirmar reportes, análisis y gráficos pendientes del almacén consolidado
+    output_manager.flush_store()
+
+    if output_manager.columnar_format:
+        output_manager.save_table_to_columnar("output_table", part=part)
 
 
 async def create_output_table_async(issues: List[IssueInfo]) -> None:
     '''
     Método que hace el procesamiento de la información.
-    
+
     Recibe una lista de información de issues. Genera la cadena de consulta y salida.'''
 
     # Obtener la instancia del OutputManager
@@ -109,86 +424,63 @@ async def create_output_table_async(issues: List[IssueInfo]) -> None:
     # Crear el objeto de tipo OutputRunnable para la cadena
     output_runnable = OutputRunnable(output_manager)
 
-    # Obtener parámetros de configuración
-    model = os.getenv("LLM_MODEL", "gemini-2.5-flash")
-    api_key = os.getenv("LLM_API_KEY")
-
-    # Crear prompt desde una plantilla. Parametrizado a variables
-    prompt = ChatPromptTemplate.from_template("""
-    Eres un asistente que resume información de issues de Jira para reportes de negocio.
-
-    Analiza los siguientes datos de un issue:
-    - Clave del issue: {key}
-    - Épica del issue: {epic_key}
-    - Fecha de resolución: {resolution_date}                  
-    - Resumen original: {summary}
-    - Descripción: {description}
-    - Documento de valor de negocio: {business_info}
+    # La "cadena" de ejecución. De tipo RunnableSequence
+    chain = create_analysis_chain(output_runnable)
 
-    Genera una respuesta estructurada con los siguientes campos:
+    # Con LLM_PRIORITY_KEYS, las llamadas se hacen por prioridad (recientes, cortas, por
+    # épica...); sin claves, en el orden de entrada. Los issues se numeran en el orden
+    # planificado, así que la tabla sigue ese orden y el buffer de orden se mantiene acotado
+    scheduler = LLMScheduler(max_concurrency=ANALYSIS_MAX_CONCURRENCY)
+    issues = scheduler.schedule(issues)
 
-    1. "resumen": descripción breve (máximo 10 palabras) que explica de qué se trata el issue.
-    2. "valor_negocio": resumen (máximo 25 palabras) del valor de negocio aportado por la HU, usando únicamente la sección de "objetivos de la iniciativa" del documento.
-    3. "metrica_impactada": nombre de la métrica más impactada por la HU, sin explicaciones adicionales.
-    4. "impactos_globales": el impacto que la HU tiene en todas las métricas definidas en la sección correspondiente, con nivel "Nulo", "Bajo", "Medio" o "Alto".
-    5. "justificaciones": la justificación para cada uno de los impactos del punto anterior, con nombre de métrica y justificación.
-    6. "issue_key": la clave de identificación del issue de Jira (por ejemplo, "SVA-1000").
-    7. "epic_key": la clave de identificación de la épica a la que pertenece el issue (por ejemplo: GOBI-800).
-    8. "resolution_date": la fecha en la que se resolvió el issue, expresada en formato MM-DD
-    """)
-
-    llm = ChatGoogleGenerativeAI(
-        model=model,
-        google_api_key=api_key,
-        temperature=0
-        )
-    
-    # Crear LLM con salida estructurada. Este paso es crítico.
-    # Genera un RunnableBinding que hace un wrapper de LLM comportamiento adicional
-    # (en este caso, la capacidad de manejar salida estructurada)
-    structured_llm = llm.with_structured_output(IssueAnalysis)
+    # Analizar una sola vez cada grupo de issues casi duplicados. Cada issue conserva su
+    # posición en la entrada, que es la de su fila en la tabla
+    indexes = deduplicate_issues(issues, output_manager)
+    analyzed = [issues[index] for index in indexes]
 
-    # La "cadena" de ejecución. De tipo RunnableSequence
-<<<<<<< Updated upstream
-    chain = prompt | structured_llm | output_runnable
-=======
-    if not RATE_LIMITING:
-        chain = prompt | structured_llm | output_runnable
-    else:
-        # Incorpora el limitador para esperar por cada llamada
-        print("Usaremos un limitador de llamadas para no exceder la tasa permitida...")
-        chain = prompt | RateLimitingRunnable() | structured_llm | output_runnable
->>>>>>> Stashed changes
+    # Escribir las filas a medida que se completan, si está configurado (OUTPUT_STREAM)
+    output_manager.open_stream("output_table.csv")
 
     # Introduciremos ejecución asincrónica
-    inputs = [
-        {
-            "key": issue.key,
-            "epic_key": issue.epic_key,
-            "resolution_date": issue.resolution_date,
-            "summary": issue.summary,
-            "description": issue.description,
-            "business_info": issue.business_info
-        }
-        for issue in issues        
-    ]
+    inputs = [issue_to_prompt_input(issue) for issue in analyzed]
+    configs = [issue_to_run_config(issues[index], index) for index in indexes]
 
     try:
-        print("Iniciando ejecución asíncrona del proceso...")
-        results = await chain.abatch(inputs, max_concurrency=5)
+        logger.info("Iniciando ejecución asíncrona del proceso...")
+
+        # Cada llamada lleva la clave de su issue como identificador de correlación de los logs
+        results = await scheduler.run(chain, analyzed, inputs, configs)
 
+        # Los issues que fallaron (y sus duplicados) no tendrán fila: no se esperan en el
+        # orden de salida
+        for index, issue, result in zip(indexes, analyzed, results):
+            if isinstance(result, Exception):
+                logger.error("Error al procesar el issue %s: %s", issue.key, result)
+                output_manager.skip_analysis(index, issue.key)
 
     except Exception as e:
-        print(f"Error al procesar el issue {issue.key}: {e}")
-    
-    output_manager.save_table_to_csv("output_table.csv")
+        logger.error("Error al procesar el lote de issues: %s", e)
+
+    finally:
+        # El pool HTTP del backend compatible con OpenAI está ligado a este loop: se cierra
+        # antes de que asyncio.run lo termine (sólo si el cliente se llegó a crear)
+        if LLMClient._instance is not None:
+            await LLMClient().aclose()
 
+    save_output_tables(output_manager, "output_table.csv")
 
-def create_output_table(issues: List[IssueInfo]) -> None:
+
+def create_output_table(
+        issues: List[IssueInfo],
+        table_filename: str = "output_table.csv",
+        part: int = None,
+        shard_count: int = 1) -> None:
     '''
     Método que hace el procesamiento de la información.
-    
-    Recibe una lista de información de issues. Genera la cadena de consulta y salida.'''
+
+    Recibe una lista de información de issues. Genera la cadena de consulta y salida.
+    El parámetro part identifica la partición cuando se ejecuta dentro de un proceso de trabajo,
+    y shard_count la cantidad de particiones (que se reparten el límite de tasa del LLM).'''
 
     # Obtener la instancia del OutputManager
     output_manager = OutputManager()
@@ -196,76 +488,134 @@ def create_output_table(issues: List[IssueInfo]) -> None:
     # Crear el objeto de tipo OutputRunnable para la cadena
     output_runnable = OutputRunnable(output_manager)
 
-    # Obtener parámetros de configuración
-    model = os.getenv("LLM_MODEL", "gemini-2.5-flash")
-    api_key = os.getenv("LLM_API_KEY")
+    # La "cadena" de ejecución. De tipo RunnableSequence
+    chain = create_analysis_chain(output_runnable, shard_count)
 
-    # Crear prompt desde una plantilla. Parametrizado a variables
-    prompt = ChatPromptTemplate.from_template("""
-    Eres un asistente que resume información de issues de Jira para reportes de negocio.
+    # Orden de análisis (y de la tabla) según LLM_PRIORITY_KEYS; por defecto, el de entrada
+    issues = LLMScheduler().schedule(issues)
 
-    Analiza los siguientes datos de un issue:
-    - Clave del issue: {key}
-    - Épica del issue: {epic_key}
-    - Fecha de resolución: {resolution_date}                  
-    - Resumen original: {summary}
-    - Descripción: {description}
-    - Documento de valor de negocio: {business_info}
+    # Analizar una sola vez cada grupo de issues casi duplicados. Cada issue conserva su
+    # posición en la entrada, que es la de su fila en la tabla
+    indexes = deduplicate_issues(issues, output_manager)
 
-    Genera una respuesta estructurada con los siguientes campos:
+    # Escribir las filas a medida que se completan, si está configurado (OUTPUT_STREAM)
+    output_manager.open_stream(table_filename)
 
-    1. "resumen": descripción breve (máximo 10 palabras) que explica de qué se trata el issue.
-    2. "valor_negocio": resumen (máximo 25 palabras) del valor de negocio aportado por la HU, usando únicamente la sección de "objetivos de la iniciativa" del documento.
-    3. "metrica_impactada": nombre de la métrica más impactada por la HU, sin explicaciones adicionales.
-    4. "impactos_globales": el impacto que la HU tiene en todas las métricas definidas en la sección correspondiente, con nivel "Nulo", "Bajo", "Medio" o "Alto".
-    5. "justificaciones": la justificación para cada uno de los impactos del punto anterior, con nombre de métrica y justificación.
-    6. "issue_key": la clave de identificación del issue de Jira (por ejemplo, "SVA-1000").
-    7. "epic_key": la clave de identificación de la épica a la que pertenece el issue (por ejemplo: GOBI-800).
-    8. "resolution_date": la fecha en la que se resolvió el issue, expresada en formato MM-DD
-    """)
-
-    llm = ChatGoogleGenerativeAI(
-        model=model,
-        google_api_key=api_key,
-        temperature=0
-        )
-    
-    # Crear LLM con salida estructurada. Este paso es crítico.
-    # Genera un RunnableBinding que hace un wrapper de LLM comportamiento adicional
-    # (en este caso, la capacidad de manejar salida estructurada)
-    structured_llm = llm.with_structured_output(IssueAnalysis)
+    for index in indexes:
+        issue = issues[index]
 
-    # La "cadena" de ejecución. De tipo RunnableSequence
-    chain = prompt | structured_llm | output_runnable
+        # Los logs del ciclo llevan la clave del issue como identificador de correlación
+        with correlation(issue.key):
+            logger.debug("Procesando issue %s para tabla de salida...", issue.key)
+
+            # Crear la estructura de entrada, con los parámetros que espera el prompt
+            issue_data = issue_to_prompt_input(issue)
 
+            try:
+                # Invocar la cadena. Esto genera la ejecución del RunnableSequence. En este caso,
+                # el prompt que entra en el LLM con estructura
+                result = chain.invoke(issue_data, issue_to_run_config(issue, index))
+                if result:
+                    logger.debug("Completado el ciclo para HU: %s...", issue.key)
+
+
+            except Exception as e:
+                logger.error("Error al procesar el issue %s: %s", issue.key, e)
+                output_manager.skip_analysis(index, issue.key)
+                continue
+
+    save_output_tables(output_manager, table_filename, part)
+
+
+def partition_issues_by_epic(issues: List[IssueInfo], shard_count: int) -> List[List[IssueInfo]]:
+    '''
+    Método que reparte los issues en particiones, manteniendo juntos los de una misma épica.
+
+    Las épicas se asignan de mayor a menor tamaño a la partición con menos issues, para
+    equilibrar la carga entre procesos. Las particiones vacías se descartan.'''
+
+    # Agrupar los issues por épica, respetando el orden del filtro dentro de cada grupo
+    groups: Dict[str, List[IssueInfo]] = {}
     for issue in issues:
-        print(f"Procesando issue {issue.key} para tabla de salida...")
+        groups.setdefault(issue.epic_key, []).append(issue)
 
-        # Crear la estructura de entrada, con los parámetros que espera el prompt
-        issue_data = {
-            "key": issue.key,
-            "epic_key": issue.epic_key,
-            "resolution_date": issue.resolution_date,
-            "summary": issue.summary,
-            "description": issue.description,
-            "business_info": issue.business_info
-        }
+    # Asignar cada épica a la partición con menos carga
+    shards: List[List[IssueInfo]] = [[] for _ in range(max(1, shard_count))]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+
+    return [shard for shard in shards if shard]
+
+
+def _process_shard(shard_index: int, issues: List[IssueInfo], shard_count: int = 1) -> str:
+    '''
+    Método que ejecuta un proceso de trabajo sobre una partición de issues.
+
+    Cada proceso tiene su propia cadena y su propio OutputManager, y escribe una tabla
+    parcial. Retorna el nombre del archivo parcial.'''
+
+    # Asegurar que la tabla del proceso comienza vacía
+    OutputManager().clear_table()
+
+    # Procesar la partición en forma síncrona dentro de este proceso. Los logs que no son
+    # de un issue en particular llevan la partición como identificador de correlación
+    partial_filename = f"output_table_shard{shard_index}.csv"
+    with correlation(f"shard{shard_index}"):
+        create_output_table(issues, partial_filename, part=shard_index, shard_count=shard_count)
+
+    # Eliminar los cachés de contexto creados por este proceso
+    EpicContextCache().clear()
+
+    return partial_filename
+
+
+def create_output_table_sharded(issues: List[IssueInfo], workers: int = None) -> None:
+    '''
+    Método que reparte el procesamiento en varios procesos, particionando los issues por épica.
+
+    Cada proceso genera una tabla parcial. Al final se combinan en output_table.csv,
+    respetando el orden original del filtro.'''
+
+    # Número de procesos. Por defecto, uno por núcleo
+    workers = workers or int(os.getenv("SHARD_WORKERS", os.cpu_count() or 1))
+
+    # Particionar por épica
+    shards = partition_issues_by_epic(issues, workers)
+    if not shards:
+        logger.warning("No hay issues para procesar.")
+        return
+
+    logger.info("Procesando %s issues en %s procesos...", len(issues), len(shards))
+
+    # Los procesos agregan archivos a la salida columnar, así que se limpia una sola vez aquí
+    output_manager = OutputManager()
+    if output_manager.columnar_format and not output_manager.columnar_append:
+        output_manager.clear_columnar_output("output_table")
+
+    # Usar "spawn" para no heredar hilos ni conexiones abiertas del proceso principal
+    context = multiprocessing.get_context("spawn")
 
-        try:
-            # Invocar la cadena. Esto genera la ejecución del RunnableSequence. En este caso,
-            # el prompt que entra en el LLM con estructura
-            result = chain.invoke(issue_data)
-            if result:
-                print(f"Completado el ciclo para HU: {issue.key}...")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        futures = [
+            executor.submit(_process_shard, index, shard, len(shards))
+            for index, shard in enumerate(shards)
+        ]
+        partial_files = [future.result() for future in futures]
 
+    # Combinar las tablas parciales en la tabla final
+    output_manager.merge_tables(
+        partial_files,
+        "output_table.csv",
+        key_order=[issue.key for issue in issues]
+    )
 
-        except Exception as e:
-            print(f"Error al procesar el issue {issue.key}: {e}")
-            continue
-    
-    output_manager.save_table_to_csv("output_table.csv")
+    # Combinar los agregados por épica de cada proceso
+    output_manager.merge_rollups(
+        [f"epic_rollup_shard{index}.csv" for index in range(len(shards))],
+        "epic_rollup.csv"
+    )
 
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,14 +2,155 @@ from dotenv import load_dotenv
 import matplotlib.pyplot as plt
 import os
 import re
+import io
+import csv
+import json
+import shutil
+import threading
 import textwrap
 import pandas as pd
 from langchain_core.runnables import Runnable
 from jira_client import IssueAnalysis
+from output_store import OutputStore
+from epic_rollup import ImpactRollup
 from datetime import datetime
+from log_config import get_logger
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+
+class TableStreamWriter:
+    '''
+    Escritor incremental de la tabla de salida (CSV o JSONL).
+
+    Cada fila se agrega al archivo apenas se produce, bajo un lock, para que las invocaciones
+    concurrentes no intercalen líneas. Un hilo de fondo vacía el buffer al disco cada
+    flush_interval segundos, así el archivo se puede seguir (tail) mientras avanza la ejecución.
+    '''
+
+    def __init__(self, path: str, headers: list, fmt: str = "csv", flush_interval: float = 2.0):
+        self.path = path
+        self.headers = headers
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.rows = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        if fmt == "jsonl":
+            self._file = open(path, "w", encoding="utf-8")
+            self._writer = None
+        else:
+            self._file = open(path, "w", encoding="utf-8-sig", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=headers, extrasaction="ignore")
+            self._writer.writeheader()
+
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+    def write_row(self, row: dict) -> None:
+        '''
+        Método que agrega una fila al archivo (queda en el buffer hasta el siguiente vaciado)
+        '''
+        with self._lock:
+            if self._writer is not None:
+                self._writer.writerow(row)
+            else:
+                self._file.write(json.dumps({h: row.get(h) for h in self.headers}, ensure_ascii=False) + "\n")
+            self.rows += 1
+
+
+    def flush(self) -> None:
+        '''
+        Método que vacía al disco las filas pendientes
+        '''
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+
+    def close(self) -> None:
+        '''
+        Método que detiene el vaciado periódico y cierra el archivo
+        '''
+        self._stop.set()
+        self._flusher.join()
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class ReorderBuffer:
+    '''
+    Buffer que entrega los resultados en el orden original de los issues (índice de entrada),
+    aunque las llamadas al LLM terminen en otro orden.
+
+    Los resultados que llegan antes de su turno se retienen. La ventana limita cuántos se
+    retienen: si se supera, se libera el menor índice pendiente y se da por perdido lo que
+    falte antes de él (las filas que lleguen después se escriben de inmediato, fuera de orden).
+    '''
+
+    def __init__(self, window: int):
+        self.window = window
+        self.next_index = 0
+        self.pending = {}
+        self.skipped = set()
+
+    def put(self, index: int, entries: list) -> list:
+        '''
+        Método que agrega los resultados de un índice y entrega los que ya pueden escribirse
+        '''
+        if index < self.next_index:
+            return list(entries)
+
+        self.pending[index] = entries
+        return self._release()
+
+    def skip(self, index: int) -> list:
+        '''
+        Método que marca un índice sin resultado (falla) para no esperarlo
+        '''
+        if index >= self.next_index:
+            self.skipped.add(index)
+        return self._release()
+
+    def drain(self) -> list:
+        '''
+        Método que entrega todos los resultados pendientes, en orden, y reinicia el buffer
+        '''
+        ready = [entry for index in sorted(self.pending) for entry in self.pending[index]]
+        self.next_index = 0
+        self.pending = {}
+        self.skipped = set()
+        return ready
+
+    def _release(self) -> list:
+        ready = []
+
+        while True:
+            if self.next_index in self.pending:
+                ready.extend(self.pending.pop(self.next_index))
+            elif self.next_index in self.skipped:
+                self.skipped.discard(self.next_index)
+            elif len(self.pending) > self.window:
+                # Ventana llena: no esperar más al índice faltante
+                self.next_index = min(self.pending)
+                continue
+            else:
+                return ready
+
+            self.next_index += 1
+
+
 class OutputManager:
     _instance = None
 
@@ -28,17 +169,69 @@ class OutputManager:
             os.makedirs(self.output_dir)
 
         # Crear un DataFrame vacío para la tabla de salida
-        self.headers = ["HU", "GOBI", "Descripción", "Fecha de liberación", "Valor de negocio", "Métrica impactada"]
+        self.headers = ["HU", "GOBI", "Descripción", "Fecha de liberación", "Valor de negocio", "Métrica impactada", "Analizado como"]
         self.data = pd.DataFrame(columns=self.headers)
 
+        # Issues casi duplicados por clave del issue representante (ver issue_dedup)
+        self.duplicates = {}
+
+        # Datos estructurados por HU (niveles de impacto, fecha de resolución real) que no
+        # caben en la tabla CSV, pero sí en la salida columnar
+        self.structured_data = {}
+
+        # Agregado de impactos por épica y métrica, actualizado con cada fila de la tabla
+        self.rollup = ImpactRollup()
+
+        # Configuración de la salida columnar (parquet o arrow). Vacío = desactivada
+        self.columnar_format = os.getenv("OUTPUT_COLUMNAR_FORMAT", "").lower()
+        self.columnar_partition = os.getenv("OUTPUT_COLUMNAR_PARTITION", "epic").lower()
+        self.columnar_append = os.getenv("OUTPUT_COLUMNAR_APPEND", "false").lower() == "true"
+
+        # Escritura incremental de la tabla de salida ("csv" o "jsonl"). Vacío = la tabla se
+        # mantiene en memoria y se guarda al final. Con streaming, las filas no se guardan en
+        # memoria y el archivo se vacía al disco cada OUTPUT_STREAM_FLUSH_SECONDS
+        self.stream_format = os.getenv("OUTPUT_STREAM", "").lower()
+        self.stream_flush_seconds = float(os.getenv("OUTPUT_STREAM_FLUSH_SECONDS", "2"))
+        self.stream = None
+
+        # Ruta de la última tabla guardada (la salida columnar la lee si no está en memoria)
+        self.last_table_path = None
+
+        # Las invocaciones asíncronas escriben filas desde varios hilos
+        self._table_lock = threading.Lock()
+
+        # Las filas se escriben en el orden de los issues de entrada, con un máximo de
+        # OUTPUT_REORDER_WINDOW resultados retenidos a la espera de su turno. 0 = sin reordenar
+        self.reorder_window = int(os.getenv("OUTPUT_REORDER_WINDOW", "100"))
+        self.reorder_buffer = ReorderBuffer(self.reorder_window)
+        self._order_lock = threading.Lock()
+
+        # Identificador de la ejecución. Se publica en el entorno para que los procesos de
+        # trabajo (ejecución particionada) compartan los mismos destinos
+        self.run_id = os.getenv("OUTPUT_RUN_ID") or datetime.now().strftime("%Y%m%d%H%M%S")
+        os.environ["OUTPUT_RUN_ID"] = self.run_id
+
+        # Destino de reportes y gráficos: un archivo por issue ("files") o un almacén
+        # consolidado por ejecución ("sqlite")
+        self.store = None
+        if os.getenv("OUTPUT_SINK", "files").lower() == "sqlite":
+            store_path = os.path.join(self.output_dir, f"outputs_{self.run_id}.sqlite")
+            self.store = OutputStore(store_path)
+            logger.info("Consolidated output store: %s", store_path)
+
         # Informar de la ruta de salida
-        print(f"Output directory set to: {self.output_dir}")
+        logger.info("Output directory set to: %s", self.output_dir)
 
     def save_output_to_text(self, filename: str, content: str) -> None:
         '''
         Método para guardar contenido en un archivo dentro del directorio de salida
         '''
 
+        # Con almacén consolidado, el reporte se guarda ahí (clave del issue)
+        if self.store:
+            self.store.put(filename.removesuffix(".txt"), report=content)
+            return
+
         # Agrear extensión .txt al nombre del archivo (key del issue)
         if not filename.endswith(".txt"):
             filename += ".txt"
@@ -51,7 +244,7 @@ class OutputManager:
             f.write(content)
 
         # Informar al usuario
-        print(f"Output saved to {file_path}")
+        logger.debug("Output saved to %s", file_path)
 
     
     def create_visual_output(self, key, metrics_data) -> None:
@@ -74,7 +267,13 @@ class OutputManager:
             "Nulo": 0
         }
 
-        # Preparar datos para visualización
+        # Preparar datos para visualización. Los niveles desconocidos se omiten
+        # en lugar de interrumpir la salida
+        metrics_data = {m: l for m, l in metrics_data.items() if l in level_mappging}
+        if not metrics_data:
+            logger.warning("No hay impactos válidos para graficar en %s", key)
+            return
+
         metrics = list(metrics_data.keys())
         impacts = [level_mappging[metrics_data[m]] for m in metrics]
 
@@ -111,66 +310,168 @@ class OutputManager:
 
         plt.tight_layout()
 
-        # Crear ruta para archivo de salida
-        file_path = os.path.join(self.output_dir, f"{key}.jpg")
-        plt.savefig(file_path, dpi=300, bbox_inches='tight', format='png')
+        # Con almacén consolidado, guardar los bytes del gráfico en lugar de un archivo
+        if self.store:
+            buffer = io.BytesIO()
+            plt.savefig(buffer, dpi=300, bbox_inches='tight', format='png')
+            self.store.put(key, chart=buffer.getvalue())
+        else:
+            # Crear ruta para archivo de salida
+            file_path = os.path.join(self.output_dir, f"{key}.jpg")
+            plt.savefig(file_path, dpi=300, bbox_inches='tight', format='png')
+
+        # Liberar la figura
+        plt.close()
 
         # plt.show()
 
 
-    def obtain_impact_list(self, text: str) -> dict:
-        """
-        Transforma la cadena de texto de impactos globales en un diccionario.
-        
-        El formato de entrada esperado es: 'Métrica 1: Valor A, Métrica 2: Valor B, ...'
-        Si el valor es 'Nulo', se reemplaza por 'Bajo' para el ejemplo.
-        
-        Args:
-            impactos_globales_str (str): La cadena de impacto recibida del LLM.
-            
-        Returns:
-            dict: Un diccionario con el formato {'Métrica': 'Valor'}.
-        """
+    def obtain_impact_levels(self, impacts: list) -> dict:
+        '''
+        Transforma la lista estructurada de impactos (MetricImpact) en un diccionario
+        con el formato {'Métrica': 'Nivel'}, sin necesidad de interpretar texto.
+        '''
+        return {impact.metrica: impact.nivel.value for impact in impacts}
 
-        impacts_dict = {}
 
-        # Separar la cadena por cada par
-        pairs = text.split(', ')
+    def add_record_to_table(self, record: dict, impacts: dict = None, resolved_at: str = None) -> None:
+        '''
+        Método para crear una tabla de salida (placeholder)
+
+        Opcionalmente guarda los niveles de impacto y la fecha de resolución de Jira del
+        issue, que se usan en la salida columnar.
+        '''
+        with self._table_lock:
+            # Con streaming, la fila va directo al archivo
+            if self.stream:
+                self.stream.write_row(record)
+            else:
+                # Validar si el DataFrame está vacío ya tiene encabezados; si no, agregarlos
+                if self.data.empty and list(self.data.columns) != self.headers:
+                    # Crear lista de encabezados
+                    self.data = pd.DataFrame(columns=self.headers)
 
-        # Iterar la lista de pares
-        for pair in pairs:
-            # Usar ":" como separador
-            if ":" in pair:
-                # Obtener par de clave y valor
-                key, value = pair.split(': ', 1)
-                clean_value = value.strip()
+                self.data = pd.concat([self.data, pd.DataFrame([record])], ignore_index=True)
 
-            # Agregar en forma de dict (clave, valor)
-            impacts_dict[key.strip()] = clean_value
+            # Guardar los datos estructurados del issue
+            self.structured_data[record["HU"]] = {
+                "impactos": impacts or {},
+                "fecha_resolucion": resolved_at
+            }
 
-        # Retornar colección
-        return impacts_dict
+            # Sumar los niveles de impacto al agregado de la épica
+            self.rollup.add(record.get("GOBI"), impacts)
 
 
-    def add_record_to_table(self, record: dict) -> None:
+    def submit_records(self, index: int, entries: list) -> None:
         '''
-        Método para crear una tabla de salida (placeholder)
+        Método que agrega a la tabla las filas de un issue (y de sus duplicados) respetando
+        el orden de entrada.
+
+        Cada elemento de entries es una tupla (record, impacts, resolved_at), como los
+        argumentos de add_record_to_table. Sin índice, o con el reordenamiento desactivado,
+        las filas se agregan de inmediato.
+        '''
+        if index is None or self.reorder_window <= 0:
+            for record, impacts, resolved_at in entries:
+                self.add_record_to_table(record, impacts=impacts, resolved_at=resolved_at)
+            return
+
+        # El lock cubre también la escritura, para que los hilos no alteren el orden liberado
+        with self._order_lock:
+            for record, impacts, resolved_at in self.reorder_buffer.put(index, entries):
+                self.add_record_to_table(record, impacts=impacts, resolved_at=resolved_at)
+
+
+    def skip_record(self, index: int) -> None:
+        '''
+        Método que avisa que el issue del índice indicado no tendrá fila (falla en el análisis)
+        '''
+        if index is None or self.reorder_window <= 0:
+            return
+
+        with self._order_lock:
+            for record, impacts, resolved_at in self.reorder_buffer.skip(index):
+                self.add_record_to_table(record, impacts=impacts, resolved_at=resolved_at)
+
+
+    def skip_analysis(self, index: int, issue_key: str) -> None:
+        '''
+        Método que avisa que un issue cuyo análisis falló no tendrá fila, y tampoco sus
+        casi duplicados, que esperaban copiar ese análisis
+        '''
+        self.skip_record(index)
+
+        for duplicate_index, duplicate in self.pop_duplicates(issue_key):
+            logger.error("El issue %s queda sin fila: falló el análisis de su representante %s", duplicate.key, issue_key)
+            self.skip_record(duplicate_index)
+
+
+    def flush_ordered_records(self) -> None:
+        '''
+        Método que escribe las filas que quedaron retenidas en el buffer de orden
         '''
-        # Validar si el DataFrame está vacío ya tiene encabezados; si no, agregarlos
-        if self.data.empty and list(self.data.columns) != self.headers:
-            # Crear lista de encabezados
-            self.data = pd.DataFrame(columns=self.headers)
+        with self._order_lock:
+            for record, impacts, resolved_at in self.reorder_buffer.drain():
+                self.add_record_to_table(record, impacts=impacts, resolved_at=resolved_at)
 
-        self.data = pd.concat([self.data, pd.DataFrame([record])], ignore_index=True)
 
-            
     def clear_table(self) -> None:
         '''
         Método para limpiar la tabla de salida (placeholder)
         '''
+        self.close_stream()
+        self.reorder_buffer = ReorderBuffer(self.reorder_window)
+        self.rollup = ImpactRollup()
         self.data = pd.DataFrame(columns=self.headers)
+        self.structured_data = {}
+        self.duplicates = {}
+
+
+    def register_duplicates(self, representative_key: str, duplicates: list) -> None:
+        '''
+        Método para registrar los issues que reciben el mismo análisis que su representante,
+        como tuplas (posición en la entrada, issue)
+        '''
+        self.duplicates[representative_key] = list(duplicates)
+
+
+    def pop_duplicates(self, representative_key: str) -> list:
+        '''
+        Método que entrega (y olvida) los duplicados registrados para un representante
+        '''
+        return self.duplicates.pop(representative_key, [])
 
     
+    def open_stream(self, filename: str) -> None:
+        '''
+        Método que abre la escritura incremental de la tabla de salida, si está configurada.
+
+        En formato CSV se escribe directamente el archivo final de la tabla; en JSONL se
+        escribe un archivo .jsonl del mismo nombre, que se convierte a CSV al guardar la tabla.
+        '''
+        if self.stream_format not in ("csv", "jsonl"):
+            return
+
+        self.close_stream()
+
+        base = filename.removesuffix(".csv")
+        path = os.path.join(self.output_dir, f"{base}.{self.stream_format}")
+        self.stream = TableStreamWriter(path, self.headers, self.stream_format, self.stream_flush_seconds)
+        logger.info("Streaming output table to %s", path)
+
+
+    def close_stream(self) -> None:
+        '''
+        Método que cierra la escritura incremental de la tabla de salida, si está abierta
+        '''
+        with self._table_lock:
+            stream, self.stream = self.stream, None
+
+        if stream:
+            stream.close()
+
+
     def save_table_to_csv(self, filename: str) -> None:
         '''
         Método para guardar la tabla de salida en un archivo CSV
@@ -183,11 +484,249 @@ class OutputManager:
         # Crear la ruta completa del archivo
         file_path = os.path.join(self.output_dir, filename)
 
-        # Guardar el DataFrame como archivo CSV
-        self.data.to_csv(file_path, index=False, encoding='utf-8-sig')
+        # Escribir las filas que aún esperaban su turno
+        self.flush_ordered_records()
+
+        stream = self.stream
+        if stream:
+            self.close_stream()
+
+            # En JSONL, convertir a CSV por bloques, sin cargar la tabla completa en memoria
+            if stream.fmt == "jsonl":
+                header = True
+                for chunk in pd.read_json(stream.path, lines=True, dtype=False, chunksize=10000):
+                    chunk.reindex(columns=self.headers).to_csv(
+                        file_path, index=False, encoding='utf-8-sig' if header else 'utf-8',
+                        mode='w' if header else 'a', header=header
+                    )
+                    header = False
+
+                if header:
+                    pd.DataFrame(columns=self.headers).to_csv(file_path, index=False, encoding='utf-8-sig')
+
+            elif os.path.abspath(stream.path) != os.path.abspath(file_path):
+                shutil.copyfile(stream.path, file_path)
+        else:
+            # Guardar el DataFrame como archivo CSV
+            self.data.to_csv(file_path, index=False, encoding='utf-8-sig')
+
+        self.last_table_path = file_path
 
         # Informar al usuario
-        print(f"Output table saved to {file_path}")
+        logger.info("Output table saved to %s", file_path)
+
+
+    def save_analysis(self, key: str, analysis: IssueAnalysis) -> None:
+        '''
+        Método para guardar el análisis estructurado de un issue. Sólo aplica con almacén consolidado.
+        '''
+        if self.store:
+            self.store.put(key, analysis=analysis.model_dump_json())
+
+
+    def flush_store(self) -> None:
+        '''
+        Método para confirmar las escrituras pendientes del almacén consolidado, si existe
+        '''
+        if self.store:
+            self.store.flush()
+
+
+    def clear_columnar_output(self, name: str) -> None:
+        '''
+        Método para eliminar una salida columnar anterior (directorio del dataset)
+        '''
+        dataset_path = os.path.join(self.output_dir, name)
+        if os.path.isdir(dataset_path):
+            shutil.rmtree(dataset_path)
+
+
+    def save_table_to_columnar(self, name: str, part: int = None) -> None:
+        '''
+        Método para guardar la tabla de salida en formato columnar (Parquet o Arrow IPC).
+
+        Escribe un dataset particionado (por épica o por mes de resolución) en un directorio
+        del mismo nombre, con columnas tipadas y una columna por métrica con su nivel de impacto.
+        Si OUTPUT_COLUMNAR_APPEND está activo, agrega archivos al dataset existente en lugar
+        de reemplazarlo. Cuando se entrega part (ejecución particionada) nunca se limpia el
+        directorio, porque lo comparten los procesos de la misma ejecución.
+        '''
+
+        if self.columnar_format not in ("parquet", "arrow"):
+            logger.warning("Formato columnar no soportado: %s", self.columnar_format)
+            return
+
+        # pyarrow es una dependencia opcional, sólo necesaria para esta salida
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+        except ImportError:
+            logger.warning("pyarrow no está instalado. No se generará la salida columnar.")
+            return
+
+        frame = self._columnar_frame()
+        if frame.empty:
+            logger.info("La tabla de salida está vacía. No se generará la salida columnar.")
+            return
+
+        dataset_path = os.path.join(self.output_dir, name)
+
+        # Reemplazar el dataset anterior, salvo en modo incremental o particionado
+        if part is None and not self.columnar_append:
+            self.clear_columnar_output(name)
+
+        # Columnas de partición soportadas
+        partition_columns = {"epic": "GOBI", "month": "mes_resolucion"}
+        partition_column = partition_columns.get(self.columnar_partition)
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+
+        # Nombre único por ejecución y proceso, para que las escrituras incrementales no se pisen
+        extension = "parquet" if self.columnar_format == "parquet" else "arrow"
+        run_stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        basename = f"part-{run_stamp}-{part or 0}-{{i}}.{extension}"
+
+        ds.write_dataset(
+            table,
+            dataset_path,
+            format="parquet" if self.columnar_format == "parquet" else "ipc",
+            partitioning=[partition_column] if partition_column else None,
+            partitioning_flavor="hive" if partition_column else None,
+            basename_template=basename,
+            existing_data_behavior="overwrite_or_ignore"
+        )
+
+        # Informar al usuario
+        logger.info("Columnar output (%s) saved to %s", self.columnar_format, dataset_path)
+
+
+    def _columnar_frame(self) -> pd.DataFrame:
+        '''
+        Construye la tabla tipada para la salida columnar: fecha de resolución como timestamp,
+        mes de resolución y una columna categórica por métrica con su nivel de impacto.
+        '''
+        # Con streaming la tabla no queda en memoria: se lee del último CSV guardado
+        if self.stream_format and self.data.empty and self.last_table_path and os.path.exists(self.last_table_path):
+            frame = pd.read_csv(self.last_table_path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+        else:
+            frame = self.data.copy()
+
+        issue_keys = frame["HU"].tolist()
+        structured = [self.structured_data.get(key, {}) for key in issue_keys]
+
+        # Fecha real de resolución (Jira), con el mes para particionar
+        resolved_at = pd.to_datetime(
+            [item.get("fecha_resolucion") for item in structured], errors="coerce", utc=True
+        )
+        frame["fecha_resolucion"] = resolved_at
+        frame["mes_resolucion"] = resolved_at.strftime("%Y-%m").fillna("sin-fecha")
+
+        # Una columna por métrica. Los niveles son una categoría ordenada
+        level_type = pd.CategoricalDtype(["Nulo", "Bajo", "Medio", "Alto"], ordered=True)
+        metrics = []
+        for item in structured:
+            for metric in item.get("impactos", {}):
+                if metric not in metrics:
+                    metrics.append(metric)
+
+        for metric in metrics:
+            levels = [item.get("impactos", {}).get(metric) for item in structured]
+            frame[f"impacto_{metric}"] = pd.Series(levels, index=frame.index, dtype=level_type)
+
+        # El resto de las columnas de la tabla son texto
+        for column in self.headers:
+            frame[column] = frame[column].astype("string")
+
+        return frame
+
+
+    def save_rollup_to_csv(self, filename: str) -> None:
+        '''
+        Método para guardar el agregado por épica y métrica (conteos por nivel y puntaje ponderado)
+        '''
+        if not filename.endswith(".csv"):
+            filename += ".csv"
+
+        file_path = os.path.join(self.output_dir, filename)
+        self.rollup.to_frame().to_csv(file_path, index=False, encoding='utf-8-sig')
+
+        logger.info("Epic rollup saved to %s", file_path)
+
+
+    def merge_rollups(self, partial_filenames: list, filename: str) -> None:
+        '''
+        Método para combinar agregados parciales (de distintos procesos) en el agregado final.
+        Los archivos parciales se eliminan una vez combinados.
+        '''
+        self.rollup = ImpactRollup()
+
+        for name in partial_filenames:
+            path = os.path.join(self.output_dir, name)
+            if os.path.exists(path):
+                self.rollup.load_frame(pd.read_csv(path, encoding='utf-8-sig', keep_default_na=False))
+                os.remove(path)
+
+        self.save_rollup_to_csv(filename)
+
+
+    def save_tables_by_filter(self, filename: str, membership: dict) -> None:
+        '''
+        Método que reparte la tabla combinada en una tabla por filtro (output_table_filter<ID>.csv).
+
+        membership indica las claves de HU de cada filtro. Los issues compartidos entre filtros
+        se analizaron una sola vez; aquí su fila se copia a cada tabla en la que aparecen.
+        '''
+        if not filename.endswith(".csv"):
+            filename += ".csv"
+
+        file_path = os.path.join(self.output_dir, filename)
+        if not os.path.exists(file_path):
+            logger.warning("No existe la tabla combinada %s. No se generarán tablas por filtro.", file_path)
+            return
+
+        table = pd.read_csv(file_path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+        base = filename.removesuffix(".csv")
+
+        for filter_id, keys in membership.items():
+            filter_path = os.path.join(self.output_dir, f"{base}_filter{filter_id}.csv")
+            table[table["HU"].isin(set(keys))].to_csv(filter_path, index=False, encoding='utf-8-sig')
+            logger.info("Output table for filter %s saved to %s", filter_id, filter_path)
+
+
+    def merge_tables(self, partial_filenames: list, filename: str, key_order: list = None) -> None:
+        '''
+        Método para combinar tablas parciales (por ejemplo, de distintos procesos) en una tabla final.
+
+        Si se entrega key_order, las filas se ordenan según el orden de las claves de HU.
+        Los archivos parciales se eliminan una vez combinados, junto con sus archivos de
+        escritura incremental en JSONL (OUTPUT_STREAM=jsonl).
+        '''
+
+        # Leer las tablas parciales que existan
+        partial_paths = [os.path.join(self.output_dir, name) for name in partial_filenames]
+        frames = [
+            pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+            for path in partial_paths if os.path.exists(path)
+        ]
+
+        # Combinar en la tabla de salida
+        self.data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=self.headers)
+
+        # Restaurar el orden original de los issues, si se conoce
+        if key_order:
+            position = {key: index for index, key in enumerate(key_order)}
+            self.data = self.data.sort_values(
+                by="HU", key=lambda column: column.map(position), kind="stable"
+            ).reset_index(drop=True)
+
+        # Guardar la tabla final
+        self.save_table_to_csv(filename)
+
+        # Eliminar los archivos parciales y los .jsonl de los que se convirtieron
+        stream_paths = [f"{path.removesuffix('.csv')}.jsonl" for path in partial_paths]
+        for path in partial_paths + stream_paths:
+            if os.path.exists(path):
+                os.remove(path)
 
 
 class OutputRunnable(Runnable):
@@ -196,16 +735,60 @@ class OutputRunnable(Runnable):
 
     def invoke(self, result, config=None):
 
-        print(f"Generando salida para issue {result.issue_key}")
-        execution = os.getenv("EXECUTION", "asynch")
+        # Datos originales del issue desde Jira, si vienen en los metadatos de la ejecución.
+        # Las claves de Jira mandan; las que repite el LLM sólo se usan para validar
+        metadata = (config or {}).get("metadata", {})
+        result = self._use_jira_keys(result, metadata)
+        issue_key = result.issue_key
+
+        # Issues casi duplicados que no pasaron por el LLM y reciben este mismo análisis
+        duplicates = self.output_manager.pop_duplicates(issue_key)
+        analyzed_as = issue_key if duplicates else ""
+
+        # Agregar las filas a la tabla de salida, cada una en su posición de la entrada
+        entry = self._write_result(result, metadata.get("resolution_date"), analyzed_as)
+        self.output_manager.submit_records(metadata.get("input_index"), [entry])
+
+        # Copiar el análisis a cada duplicado, con su propia clave y fecha de resolución
+        for duplicate_index, duplicate in duplicates:
+            copy = result.model_copy(update={
+                "issue_key": duplicate.key,
+                "resolution_date": format_release_date(duplicate.resolution_date)
+            })
+            entry = self._write_result(copy, duplicate.resolution_date, analyzed_as)
+            self.output_manager.submit_records(duplicate_index, [entry])
+
+        return result
+
+    def _use_jira_keys(self, result, metadata: dict):
+        '''
+        Reemplaza las claves del issue y de la épica que entregó el LLM por las de Jira. Las
+        diferencias se informan, ya que indican que el LLM confundió o reformateó la clave.
+        '''
+        keys = {
+            field: metadata[field] for field in ("issue_key", "epic_key")
+            if metadata.get(field) and metadata[field] != getattr(result, field)
+        }
+        if not keys:
+            return result
+
+        for field, value in keys.items():
+            logger.warning(
+                "El LLM entregó %s=%s para %s; se usa el valor de Jira (%s)",
+                field, getattr(result, field), metadata.get("issue_key"), value
+            )
+
+        return result.model_copy(update=keys)
+
+    def _write_result(self, result, resolved_at: str = None, analyzed_as: str = "") -> tuple:
+        '''
+        Genera el reporte, el análisis y el gráfico del issue, y entrega su fila para la tabla
+        de salida como tupla (fila, impactos, fecha de resolución)
+        '''
 
-        # issue_key = config.get("issue_key") if config else "unknown"
-        # issue_date = config.get("issue_date") if config else "01-01"
-        # epic_key = config.get("epic_key") if config else "unknown"
+        logger.debug("Generando salida para issue %s", result.issue_key)
+        execution = os.getenv("EXECUTION", "asynch")
 
-        # Generar salida especial para la fecha
-        # release_date = datetime.fromisoformat(issue_date.replace('Z', '+00:00')).strftime('%d-%m')
-            
         # Generar fila para guardar
         row = {
             "HU": result.issue_key,
@@ -213,11 +796,12 @@ class OutputRunnable(Runnable):
             "Descripción": result.resumen,
             "Fecha de liberación": result.resolution_date,
             "Valor de negocio": result.valor_negocio,
-            "Métrica impactada": result.metrica_impactada
+            "Métrica impactada": result.metrica_impactada,
+            "Analizado como": analyzed_as
         }
 
-        # Agregar la fila a la tabla de salida
-        self.output_manager.add_record_to_table(row)
+        # Generar lista de impactos con formato de dict
+        impact_list = self.output_manager.obtain_impact_levels(result.impactos)
 
         # Convertir la respuesta del LLM en reporte (para archivo de texto)
         report = result.to_text_report(result.issue_key)
@@ -225,12 +809,21 @@ class OutputRunnable(Runnable):
         # Guardar archivo de texto
         self.output_manager.save_output_to_text(result.issue_key, report)
 
-        # Generar lista de impactos con formato de dict
-        impact_list = self.output_manager.obtain_impact_list(result.impactos_globales)
+        # Guardar el análisis estructurado (sólo con almacén consolidado)
+        self.output_manager.save_analysis(result.issue_key, result)
 
         # Guardar impactos en gráficos
-        # Esta línea sólo puede ejecutar en la versión síncrona
-        if execution == "synch":
+        # Esta línea sólo puede ejecutar en las versiones síncronas (un hilo por proceso)
+        if execution in ("synch", "sharded"):
             self.output_manager.create_visual_output(result.issue_key, impact_list)
 
+        return row, impact_list, resolved_at
+
 
+def format_release_date(resolution_date: str) -> str:
+    '''
+    Convierte la fecha de resolución de Jira (ISO) al formato MM-DD que usa la tabla de salida
+    '''
+    if resolution_date and resolution_date[:4].isdigit():
+        return resolution_date[5:10]
+    return resolution_date
@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+
+class OutputStore:
+    '''
+    Almacén consolidado de salidas: una sola base SQLite por ejecución, en lugar de un archivo
+    de texto y un gráfico por issue.
+
+    Guarda, por clave de issue, el reporte de texto, el análisis estructurado (JSON) y los
+    bytes del gráfico. Las escrituras se acumulan en memoria y se confirman en lotes, en una
+    sola transacción por lote.
+    '''
+
+    def __init__(self, db_path: str, batch_size: int = None):
+        self.db_path = db_path
+        self.batch_size = batch_size or int(os.getenv("OUTPUT_STORE_BATCH_SIZE", "50"))
+
+        # Escrituras pendientes de confirmar
+        self._pending = []
+        self._lock = threading.Lock()
+
+        # Conexión compartida entre hilos (protegida por el lock). El timeout permite que varios
+        # procesos de una ejecución particionada escriban en la misma base
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outputs (
+                issue_key TEXT PRIMARY KEY,
+                report TEXT,
+                analysis TEXT,
+                chart BLOB
+            )
+            """
+        )
+        self._connection.commit()
+
+
+    def put(self, issue_key: str, report: str = None, analysis: str = None, chart: bytes = None) -> None:
+        '''
+        Método para agregar (o completar) la salida de un issue. Los campos en None no
+        sobrescriben lo que ya exista para la misma clave.
+        '''
+        with self._lock:
+            self._pending.append((issue_key, report, analysis, chart))
+
+            if len(self._pending) >= self.batch_size:
+                self._flush_pending()
+
+
+    def flush(self) -> None:
+        '''
+        Método para confirmar en la base todas las escrituras pendientes
+        '''
+        with self._lock:
+            self._flush_pending()
+
+
+    def close(self) -> None:
+        '''
+        Método para confirmar lo pendiente y cerrar la conexión
+        '''
+        with self._lock:
+            self._flush_pending()
+            self._connection.close()
+
+
+    def _flush_pending(self) -> None:
+        # Debe llamarse con el lock tomado
+        if not self._pending:
+            return
+
+        with self._connection:
+            self._connection.executemany(
+                """
+                INSERT INTO outputs (issue_key, report, analysis, chart) VALUES (?, ?, ?, ?)
+                ON CONFLICT(issue_key) DO UPDATE SET
+                    report = COALESCE(excluded.report, report),
+                    analysis = COALESCE(excluded.analysis, analysis),
+                    chart = COALESCE(excluded.chart, chart)
+                """,
+                self._pending
+            )
+
+        self._pending = []
+
+
+    def export_to_files(self, target_dir: str) -> int:
+        '''
+        Método para regenerar la estructura de un archivo por issue (reporte .txt, análisis .json
+        y gráfico .jpg) a partir del almacén. Retorna la cantidad de issues exportados.
+        '''
+        self.flush()
+
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+
+        count = 0
+        with self._lock:
+            rows = self._connection.execute("SELECT issue_key, report, analysis, chart FROM outputs")
+
+            for issue_key, report, analysis, chart in rows:
+                if report is not None:
+                    with open(os.path.join(target_dir, f"{issue_key}.txt"), 'w', encoding='utf-8') as f:
+                        f.write(report)
+
+                if analysis is not None:
+                    with open(os.path.join(target_dir, f"{issue_key}.json"), 'w', encoding='utf-8') as f:
+                        json.dump(json.loads(analysis), f, ensure_ascii=False, indent=2)
+
+                if chart is not None:
+                    with open(os.path.join(target_dir, f"{issue_key}.jpg"), 'wb') as f:
+                        f.write(chart)
+
+                count += 1
+
+        logger.info("Exportados %s issues desde %s a %s", count, self.db_path, target_dir)
+        return count
+
+
+if __name__ == "__main__":
+    # Uso: python output_store.py <base.sqlite> [directorio_destino]
+    if len(sys.argv) < 2:
+        print("Uso: python output_store.py <base.sqlite> [directorio_destino]")
+        sys.exit(1)
+
+    store = OutputStore(sys.argv[1])
+    store.export_to_files(sys.argv[2] if len(sys.argv) > 2 else os.path.dirname(sys.argv[1]) or ".")
+    store.close()
@@ -0,0 +1,169 @@
+import os
+import asyncio
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+from langchain_core.runnables import Runnable
+from langchain_core.messages import SystemMessage
+from text_preprocessor import estimate_tokens
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+
+class EpicContextCache:
+    '''
+    Administra el caché de contexto del proveedor (Gemini cached content) por épica.
+
+    El prefijo del prompt (instrucciones y documento de la épica) se sube una sola vez por
+    épica y el identificador del caché se reutiliza para todos los issues hermanos de la
+    ejecución. Los prefijos más cortos que el mínimo del proveedor no se cachean.
+    '''
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EpicContextCache, cls).__new__(cls)
+            cls._instance._init_cache()
+        return cls._instance
+
+    def _init_cache(self):
+        # "explicit" crea cachés en el proveedor. En cualquier otro caso sólo se aprovecha el
+        # caché implícito de prefijos (Gemini 2.5, DeepSeek), gracias al orden del prompt
+        self.enabled = os.getenv("PROMPT_CACHE_MODE", "implicit").lower() == "explicit"
+        self.model = os.getenv("GEMINI_MODEL") or os.getenv("LLM_MODEL", "gemini-2.5-flash")
+        self.api_key = os.getenv("GEMINI_API_KEY") or os.getenv("LLM_API_KEY")
+        self.min_tokens = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+        self.ttl_seconds = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+
+        # Identificador de caché por épica (None = no se pudo o no conviene cachear)
+        self._handles = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._client = None
+
+        self.stats = {"created": 0, "reused": 0, "skipped": 0, "errors": 0}
+
+
+    def _get_client(self):
+        # El SDK de Google sólo se necesita en modo explícito
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+
+    def get_handle(self, epic_key: str, prefix: str) -> Optional[str]:
+        '''
+        Método que entrega el identificador del caché de la épica, creándolo la primera vez.
+        Retorna None si el caché está desactivado, si el prefijo es muy corto o si falla la creación.
+        '''
+        if not self.enabled or not epic_key:
+            return None
+
+        # Un lock por épica, para que los issues hermanos concurrentes no creen cachés duplicados
+        with self._lock:
+            epic_lock = self._locks.setdefault(epic_key, threading.Lock())
+
+        with epic_lock:
+            if epic_key in self._handles:
+                if self._handles[epic_key]:
+                    self.stats["reused"] += 1
+                return self._handles[epic_key]
+
+            if estimate_tokens(prefix) < self.min_tokens:
+                self.stats["skipped"] += 1
+                self._handles[epic_key] = None
+                return None
+
+            try:
+                from google.genai import types
+
+                cache = self._get_client().caches.create(
+                    model=self.model,
+                    config=types.CreateCachedContentConfig(
+                        display_name=f"epic-{epic_key}",
+                        system_instruction=prefix,
+                        ttl=f"{self.ttl_seconds}s"
+                    )
+                )
+                self._handles[epic_key] = cache.name
+                self.stats["created"] += 1
+                logger.debug("Contexto de la épica %s cacheado en el proveedor (%s)", epic_key, cache.name)
+
+            except Exception as e:
+                logger.warning("No fue posible cachear el contexto de la épica %s: %s", epic_key, e)
+                self._handles[epic_key] = None
+                self.stats["errors"] += 1
+
+            return self._handles[epic_key]
+
+
+    def clear(self) -> None:
+        '''
+        Método que elimina los cachés creados en el proveedor durante la ejecución
+        '''
+        with self._lock:
+            handles = [handle for handle in self._handles.values() if handle]
+            self._handles = {}
+
+        for handle in handles:
+            try:
+                self._get_client().caches.delete(name=handle)
+            except Exception as e:
+                logger.warning("No fue posible eliminar el caché %s: %s", handle, e)
+
+        if self.stats["created"] or self.stats["skipped"]:
+            logger.info("Caché de contexto por épica: %s", self.stats)
+
+
+class EpicContextCacheRunnable(Runnable):
+    '''
+    Paso de la cadena que envía el sufijo del prompt contra el caché de la épica, si existe.
+
+    Envuelve al backend de Gemini, de modo que el router sigue eligiendo, conmutando y midiendo
+    los backends. Recibe el prompt ya formateado (mensaje de sistema con el prefijo de la épica
+    y mensaje con los datos del issue). Si hay caché para la épica (según los metadatos de la
+    ejecución), sólo se envía el mensaje del issue a un LLM ligado a ese caché; si no, el prompt
+    completo va al LLM de respaldo (el mismo backend de Gemini, sin caché).
+    '''
+
+    def __init__(self, fallback: Runnable, create_cached_llm):
+        self.fallback = fallback
+        self.create_cached_llm = create_cached_llm
+        self.cache = EpicContextCache()
+        self._cached_llms = {}
+        self._lock = threading.Lock()
+
+    def _route(self, prompt_value, config):
+        '''
+        Retorna el runnable a usar y los mensajes que recibe
+        '''
+        if not self.cache.enabled:
+            return self.fallback, prompt_value
+
+        messages = prompt_value.to_messages()
+        prefix = "\n".join(m.content for m in messages if isinstance(m, SystemMessage))
+        epic_key = (config or {}).get("metadata", {}).get("epic_key")
+
+        handle = self.cache.get_handle(epic_key, prefix)
+        if handle is None:
+            return self.fallback, prompt_value
+
+        with self._lock:
+            if handle not in self._cached_llms:
+                self._cached_llms[handle] = self.create_cached_llm(handle)
+            cached_llm = self._cached_llms[handle]
+
+        return cached_llm, [m for m in messages if not isinstance(m, SystemMessage)]
+
+    def invoke(self, input, config=None, **kwargs):
+        runnable, messages = self._route(input, config)
+        return runnable.invoke(messages, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        # La creación del caché es una llamada bloqueante; no debe detener el event loop
+        runnable, messages = await asyncio.to_thread(self._route, input, config)
+        return await runnable.ainvoke(messages, config, **kwargs)
@@ -0,0 +1,189 @@
+import os
+import math
+from typing import Dict, List
+from dotenv import load_dotenv
+from jira_client import JiraClient, IssueInfo
+from text_preprocessor import TextPreprocessor, estimate_tokens
+from llm_scheduler import get_analysis_max_concurrency
+
+load_dotenv()
+
+# Proporción aproximada de texto útil por byte del documento de negocio, según su formato.
+# Es una heurística: un .docx o un .pdf pesan bastante más que el texto que contienen
+DOCUMENT_TEXT_RATIO = {".txt": 1.0, ".docx": 0.3, ".pdf": 0.2}
+
+
+def estimate_document_tokens(document: str, document_bytes: int) -> int:
+    '''
+    Estima los tokens del documento de negocio de una épica a partir de su tamaño, sin
+    descargarlo, aplicando el presupuesto de tokens del preprocesamiento.
+    '''
+    if not document or not document_bytes:
+        return 0
+
+    extension = os.path.splitext(document.lower())[1]
+    tokens = int(document_bytes * DOCUMENT_TEXT_RATIO.get(extension, 1.0)) // 4
+
+    preprocessor = TextPreprocessor()
+    budget = preprocessor.budgets.get("business_info", 0)
+    if preprocessor.enabled and budget:
+        tokens = min(tokens, budget)
+
+    return tokens
+
+
+def get_concurrency(execution: str = None) -> int:
+    '''
+    Método que entrega cuántas llamadas al LLM corren en paralelo según el modo de ejecución.
+
+    El dry run planifica el modo de PLAN_EXECUTION (asíncrono por defecto), no el propio.
+    '''
+    execution = execution or os.getenv("EXECUTION", "asynch")
+    if execution == "dryrun":
+        execution = os.getenv("PLAN_EXECUTION", "asynch")
+
+    if execution == "asynch":
+        return get_analysis_max_concurrency()
+    if execution == "sharded":
+        return int(os.getenv("SHARD_WORKERS", os.cpu_count() or 1))
+    return 1
+
+
+def plan_issues(issues: List[IssueInfo], epics: Dict[str, dict], system_template: str, issue_template: str) -> dict:
+    '''
+    Método que proyecta el costo y la duración del análisis de una lista de issues.
+
+    Estima los tokens de cada prompt (plantillas, datos del issue y documento de la épica),
+    la cantidad de llamadas (descontando casi duplicados si ISSUE_DEDUP está activo), la
+    proporción servida desde el caché de prefijos por épica y el tiempo total según la
+    concurrencia y los límites de tasa configurados.
+    '''
+    output_tokens_per_request = int(os.getenv("PLANNER_OUTPUT_TOKENS_PER_ISSUE", "600"))
+    latency = float(os.getenv("LLM_EXPECTED_LATENCY_SECONDS", "8"))
+    requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    tokens_per_minute = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    cache_min_tokens = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+    concurrency = max(1, get_concurrency())
+
+    # Sólo se analiza un issue por grupo de casi duplicados
+    if os.getenv("ISSUE_DEDUP", "false").lower() == "true":
+        from issue_dedup import cluster_near_duplicates
+        threshold = float(os.getenv("ISSUE_DEDUP_THRESHOLD", "95"))
+        requests = [cluster[0] for cluster in cluster_near_duplicates(issues, threshold)]
+    else:
+        requests = list(issues)
+
+    system_tokens = estimate_tokens(system_template)
+    issue_template_tokens = estimate_tokens(issue_template)
+
+    # Prefijo por épica: instrucciones, resumen y documento de negocio
+    prefix_tokens = {}
+    for epic_key, epic in epics.items():
+        prefix_tokens[epic_key] = (
+            system_tokens
+            + estimate_tokens(epic.get("summary") or "")
+            + estimate_tokens(epic_key)
+            + estimate_document_tokens(epic.get("document"), epic.get("document_bytes", 0))
+        )
+
+    prompt_tokens = 0
+    cached_tokens = 0
+    cached_requests = 0
+    seen_epics = set()
+
+    for issue in requests:
+        prefix = prefix_tokens.get(issue.epic_key, system_tokens)
+        suffix = (
+            issue_template_tokens
+            + estimate_tokens(issue.key)
+            + estimate_tokens(issue.summary or "")
+            + estimate_tokens(issue.description or "")
+            + estimate_tokens(issue.resolution_date or "")
+        )
+        prompt_tokens += prefix + suffix
+
+        # El primer issue de cada épica paga el prefijo; los siguientes lo reutilizan si
+        # alcanza el mínimo del proveedor
+        if issue.epic_key and issue.epic_key in seen_epics and prefix >= cache_min_tokens:
+            cached_tokens += prefix
+            cached_requests += 1
+        seen_epics.add(issue.epic_key)
+
+    request_count = len(requests)
+    output_tokens = request_count * output_tokens_per_request
+    total_tokens = prompt_tokens + output_tokens
+
+    # Tiempo según cada restricción. La mayor es la que manda
+    bounds = {
+        "concurrency": math.ceil(request_count / concurrency) * latency,
+        "requests_per_minute": request_count / requests_per_minute * 60 if requests_per_minute else 0.0,
+        "tokens_per_minute": total_tokens / tokens_per_minute * 60 if tokens_per_minute else 0.0
+    }
+    limiting_factor = max(bounds, key=bounds.get)
+
+    # Concurrencia que basta para llegar al límite de llamadas por minuto (más no sirve)
+    recommended_concurrency = (
+        max(1, math.ceil(requests_per_minute * latency / 60)) if requests_per_minute else None
+    )
+
+    return {
+        "issues": len(issues),
+        "epics": len(epics),
+        "epics_with_document": sum(1 for epic in epics.values() if epic.get("document")),
+        "requests": request_count,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": total_tokens,
+        "cached_prompt_tokens": cached_tokens,
+        "cache_hit_ratio": cached_requests / request_count if request_count else 0.0,
+        "cached_token_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+        "concurrency": concurrency,
+        "wall_time_seconds": bounds[limiting_factor],
+        "limiting_factor": limiting_factor,
+        "recommended_concurrency": recommended_concurrency
+    }
+
+
+def plan_run(filter_ids: List[str], system_template: str, issue_template: str) -> dict:
+    '''
+    Método que planifica una ejecución (dry run) sin llamar al LLM ni descargar documentos.
+
+    Lee desde Jira sólo los campos de los issues de los filtros (cada issue una vez) y los
+    metadatos de sus épicas (resumen y tamaño del documento de negocio).
+    '''
+    jira_client = JiraClient()
+
+    issues = jira_client.proccess_issue_list_info(
+        jira_client.iter_issues_from_filters(filter_ids),
+        resolve_epics=False
+    )
+
+    epic_keys = list(dict.fromkeys(issue.epic_key for issue in issues if issue.epic_key))
+    epics = jira_client.get_epics_metadata(epic_keys)
+
+    return plan_issues(issues, epics, system_template, issue_template)
+
+
+def print_plan(plan: dict) -> None:
+    '''
+    Método que informa el plan de ejecución
+    '''
+    minutes = plan["wall_time_seconds"] / 60
+
+    print("Plan de ejecución (dry run):")
+    print(f"  Issues: {plan['issues']} ({plan['requests']} llamadas al LLM)")
+    print(f"  Épicas: {plan['epics']} ({plan['epics_with_document']} con documento de negocio)")
+    print(
+        f"  Tokens estimados: {plan['total_tokens']} "
+        f"({plan['prompt_tokens']} de entrada, {plan['output_tokens']} de salida)"
+    )
+    print(
+        f"  Caché de prefijos: {plan['cache_hit_ratio']:.0%} de las llamadas, "
+        f"{plan['cached_token_ratio']:.0%} de los tokens de entrada"
+    )
+    print(
+        f"  Tiempo estimado: {minutes:.1f} minutos con concurrencia {plan['concurrency']} "
+        f"(limitado por {plan['limiting_factor']})"
+    )
+    if plan["recommended_concurrency"]:
+        print(f"  Concurrencia suficiente para el límite de llamadas por minuto: {plan['recommended_concurrency']}")
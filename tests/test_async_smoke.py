@@ -0,0 +1,96 @@
+import os
+import asyncio
+import logging
+import pytest
+
+# La prueba ejecuta el proceso completo, así que necesita las dependencias de la aplicación
+for module in ("langchain_core", "langchain_google_genai", "jira", "pandas", "numpy", "rapidfuzz"):
+    pytest.importorskip(module)
+
+import pandas as pd
+import main
+from jira_client import EpicInfo, IssueInfo
+from output_manager import OutputManager
+from log_config import CorrelationFilter
+
+
+class CollectHandler(logging.Handler):
+    '''
+    Handler que guarda los registros con su identificador de correlación
+    '''
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+        self.addFilter(CorrelationFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def fake_run(tmp_path, monkeypatch):
+    # Backend de prueba, sin llamadas de red ni Jira, y salida en un directorio temporal
+    monkeypatch.setenv("LLM_BACKENDS", "fake")
+    monkeypatch.setenv("FAKE_LLM_LATENCY_SECONDS", "0.01")
+    monkeypatch.setenv("FAKE_LLM_FAILURE_RATE", "0")
+    monkeypatch.setenv("EXECUTION", "asynch")
+    monkeypatch.setenv("OUTPUT_DIR", str(tmp_path))
+    # Sin API keys: con LLM_BACKENDS=fake no se debe crear el modelo de Gemini
+    for name in ("LLM_API_KEY", "GEMINI_API_KEY", "OUTPUT_STREAM", "OUTPUT_SINK", "OUTPUT_COLUMNAR_FORMAT",
+                 "OUTPUT_RUN_ID", "ISSUE_DEDUP", "LLM_PRIORITY_KEYS", "PROMPT_CACHE_MODE", "LLM_REQUESTS_PER_MINUTE"):
+        monkeypatch.delenv(name, raising=False)
+
+    OutputManager._instance = None
+
+    handler = CollectHandler()
+    output_logger = logging.getLogger("output_manager")
+    level = output_logger.level
+    output_logger.setLevel(logging.DEBUG)
+    output_logger.addHandler(handler)
+
+    yield tmp_path, handler
+
+    output_logger.removeHandler(handler)
+    output_logger.setLevel(level)
+    OutputManager._instance = None
+
+
+def test_async_execution_writes_every_row(fake_run):
+    output_dir, handler = fake_run
+
+    epic = EpicInfo("GOBI-1", business_info="Documento de negocio de prueba", summary="Épica de prueba")
+    issues = [
+        IssueInfo(f"SVA-{n}", f"Resumen {n}", f"Descripción {n}", f"2024-05-0{n}T10:00:00.000-0400", epic)
+        for n in range(1, 6)
+    ]
+
+    asyncio.run(main.create_output_table_async(issues))
+
+    table = pd.read_csv(os.path.join(output_dir, "output_table.csv"))
+    assert list(table["HU"]) == [issue.key for issue in issues]
+    assert set(table["GOBI"]) == {"GOBI-1"}
+
+    # Los logs de la etapa de salida llevan la clave de su issue como identificador de correlación
+    correlated = {
+        record.correlation_id for record in handler.records
+        if record.getMessage().startswith("Generando salida")
+    }
+    assert correlated == {issue.key for issue in issues}
+
+
+def test_async_execution_writes_rows_in_priority_order(fake_run, monkeypatch):
+    output_dir, _ = fake_run
+    monkeypatch.setenv("LLM_PRIORITY_KEYS", "resolution_date_desc")
+
+    epic = EpicInfo("GOBI-1", business_info="Documento de negocio de prueba", summary="Épica de prueba")
+    issues = [
+        IssueInfo(f"SVA-{n}", f"Resumen {n}", f"Descripción {n}", f"2024-05-0{n}T10:00:00.000-0400", epic)
+        for n in range(1, 6)
+    ]
+
+    asyncio.run(main.create_output_table_async(issues))
+
+    # La tabla sigue el orden planificado: lo resuelto más recientemente primero
+    table = pd.read_csv(os.path.join(output_dir, "output_table.csv"))
+    assert list(table["HU"]) == [issue.key for issue in reversed(issues)]
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("openai")
+
+from llm_router import LLMRouter, FakeLLMBackend
+
+
+def respond_with(name):
+    return lambda input, config=None: name
+
+
+def test_failover_ranks_failing_backend_last():
+    router = LLMRouter({
+        "bad": FakeLLMBackend(respond_with("bad"), failure_rate=1.0),
+        "ok": FakeLLMBackend(respond_with("ok"))
+    })
+
+    results = [router.invoke("prompt") for _ in range(3)]
+
+    assert results == ["ok", "ok", "ok"]
+    assert router.ranked_backends() == ["ok", "bad"]
+    assert router.get_backend_stats()["bad"]["error_rate"] == 1.0
+
+
+def test_async_failover_returns_next_backend_result():
+    router = LLMRouter({
+        "bad": FakeLLMBackend(respond_with("bad"), failure_rate=1.0),
+        "ok": FakeLLMBackend(respond_with("ok"))
+    })
+
+    assert asyncio.run(router.ainvoke("prompt")) == "ok"
+
+
+def test_hedging_demotes_backend_whose_attempts_are_cancelled():
+    router = LLMRouter(
+        {
+            "slow": FakeLLMBackend(respond_with("slow"), latency=0.3),
+            "fast": FakeLLMBackend(respond_with("fast"), latency=0.0)
+        },
+        hedge_delay=0.05
+    )
+
+    async def run():
+        return [await router.ainvoke("prompt") for _ in range(3)]
+
+    assert asyncio.run(run())[0] == "fast"
+
+    # El intento cancelado del backend lento cuenta como latencia: deja de ser el primero
+    stats = router.get_backend_stats()
+    assert stats["slow"]["calls"] >= 1
+    assert stats["slow"]["error_rate"] == 0.0
+    assert router.ranked_backends() == ["fast", "slow"]
@@ -0,0 +1,208 @@
+import os
+import re
+import threading
+from dotenv import load_dotenv
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# Bloques que no aportan al análisis de negocio (código, logs, texto sin formato)
+NOISE_BLOCK_PATTERN = re.compile(r"\{(code|noformat)(:[^}]*)?\}.*?\{\1\}", re.DOTALL | re.IGNORECASE)
+
+# Marcas de Jira wiki que se eliminan dejando el contenido
+MACRO_TAG_PATTERN = re.compile(r"\{(panel|quote|color|expand|info|note|warning|tip)(:[^}]*)?\}", re.IGNORECASE)
+IMAGE_PATTERN = re.compile(r"![^!\s][^!\n]*!")
+LINK_PATTERN = re.compile(r"\[([^|\]]+)\|[^\]]+\]")
+MENTION_PATTERN = re.compile(r"\[~[^\]]+\]")
+HEADING_PATTERN = re.compile(r"^\s*h[1-6]\.\s*", re.MULTILINE)
+TABLE_SEPARATOR_PATTERN = re.compile(r"\|\|?")
+MONOSPACE_PATTERN = re.compile(r"\{\{(.+?)\}\}")
+# Efectos de texto (*negrita*, _cursiva_, -tachado-, +subrayado+, ^sup^, ~sub~, ??cita??). Como
+# en Jira, la marca abre y cierra en límite de palabra, así que no afecta a "e-mail",
+# "snake_case" ni a las viñetas "* " y "- "
+TEXT_EFFECT_PATTERN = re.compile(r"(?<![\w*_+^~?-])([*_+^~-]|\?\?)(?=\S)(.+?)(?<=\S)\1(?![\w*_+^~?-])")
+
+# Líneas con aspecto de log o stack trace pegados en la descripción
+LOG_LINE_PATTERN = re.compile(
+    r"^\s*(at [\w.$]+\(.*\)|\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}.*\b(TRACE|DEBUG|INFO|WARN|ERROR)\b.*)$",
+    re.MULTILINE
+)
+
+HORIZONTAL_SPACE_PATTERN = re.compile(r"[ \t ]+")
+BLANK_LINES_PATTERN = re.compile(r"\n\s*\n+")
+
+TRUNCATION_MARKER = "\n[...]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    '''
+    Estimación simple de tokens (aproximadamente 4 caracteres por token)
+    '''
+    return (len(text) + 3) // 4 if text else 0
+
+
+def adf_to_text(node) -> str:
+    '''
+    Convierte un documento en formato ADF (Atlassian Document Format, API v3) a texto plano.
+    Los bloques de código y los medios (imágenes) se omiten.
+    '''
+    if isinstance(node, list):
+        return "".join(adf_to_text(child) for child in node)
+
+    if not isinstance(node, dict):
+        return str(node or "")
+
+    node_type = node.get("type")
+    if node_type in ("codeBlock", "mediaSingle", "mediaGroup", "media"):
+        return ""
+    if node_type == "text":
+        return node.get("text", "")
+    if node_type == "hardBreak":
+        return "\n"
+
+    text = adf_to_text(node.get("content", []))
+
+    # Separar bloques con salto de línea
+    if node_type in ("paragraph", "heading", "listItem", "tableRow", "blockquote"):
+        text += "\n"
+    elif node_type == "tableCell" or node_type == "tableHeader":
+        text += " | "
+
+    return text
+
+
+class TextPreprocessor:
+    '''
+    Preprocesamiento de los textos que van al prompt (descripción del issue y documento de negocio).
+
+    Elimina marcas de Jira wiki/ADF, bloques de código y logs, colapsa espacios y aplica un
+    presupuesto de tokens por campo, truncando al medio (se conserva el inicio y el final).
+    Lleva la cuenta de los tokens ahorrados en la ejecución.
+    '''
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TextPreprocessor, cls).__new__(cls)
+            cls._instance._init_preprocessor()
+        return cls._instance
+
+    def _init_preprocessor(self):
+        self.enabled = os.getenv("PROMPT_PREPROCESSING", "true").lower() == "true"
+
+        # Presupuesto de tokens por campo. 0 = sin límite
+        self.budgets = {
+            "description": int(os.getenv("PROMPT_DESCRIPTION_TOKEN_BUDGET", "1500")),
+            "business_info": int(os.getenv("PROMPT_BUSINESS_INFO_TOKEN_BUDGET", "6000"))
+        }
+
+        # Proporción del presupuesto que se asigna al inicio del texto al truncar
+        self.head_ratio = float(os.getenv("PROMPT_TRUNCATION_HEAD_RATIO", "0.7"))
+
+        self._lock = threading.Lock()
+        self.stats = {
+            field: {"texts": 0, "tokens_before": 0, "tokens_after": 0, "truncated": 0}
+            for field in self.budgets
+        }
+
+
+    def prepare(self, field: str, text) -> str:
+        '''
+        Método que limpia un texto y lo ajusta al presupuesto del campo indicado
+        ("description" o "business_info").
+        '''
+        if text is None:
+            return None
+
+        # Descripciones en ADF (diccionario) se convierten a texto
+        if not isinstance(text, str):
+            text = adf_to_text(text)
+
+        if not self.enabled:
+            return text
+
+        tokens_before = estimate_tokens(text)
+
+        cleaned = self.clean(text, drop_noise=(field == "description"))
+        cleaned, truncated = self.truncate(cleaned, self.budgets.get(field, 0))
+
+        with self._lock:
+            stats = self.stats.setdefault(field, {"texts": 0, "tokens_before": 0, "tokens_after": 0, "truncated": 0})
+            stats["texts"] += 1
+            stats["tokens_before"] += tokens_before
+            stats["tokens_after"] += estimate_tokens(cleaned)
+            stats["truncated"] += int(truncated)
+
+        return cleaned
+
+
+    def clean(self, text: str, drop_noise: bool = True) -> str:
+        '''
+        Método que elimina marcas de Jira wiki y colapsa espacios. Con drop_noise también
+        elimina bloques de código/noformat y líneas de log.
+        '''
+        if drop_noise:
+            text = NOISE_BLOCK_PATTERN.sub(" ", text)
+            text = LOG_LINE_PATTERN.sub("", text)
+
+        text = IMAGE_PATTERN.sub(" ", text)
+        text = MENTION_PATTERN.sub(" ", text)
+        text = LINK_PATTERN.sub(r"\1", text)
+        text = MACRO_TAG_PATTERN.sub(" ", text)
+        text = HEADING_PATTERN.sub("", text)
+        text = MONOSPACE_PATTERN.sub(r"\1", text)
+        # Dos pasadas, para los efectos anidados (*negrita con _cursiva_*)
+        text = TEXT_EFFECT_PATTERN.sub(r"\2", TEXT_EFFECT_PATTERN.sub(r"\2", text))
+        text = TABLE_SEPARATOR_PATTERN.sub(" | ", text)
+
+        # Colapsar espacios y líneas en blanco
+        text = HORIZONTAL_SPACE_PATTERN.sub(" ", text)
+        text = BLANK_LINES_PATTERN.sub("\n\n", text)
+        text = "\n".join(line.strip() for line in text.split("\n"))
+
+        return text.strip()
+
+
+    def truncate(self, text: str, max_tokens: int):
+        '''
+        Método que trunca el texto al presupuesto de tokens, conservando el inicio y el final.
+        Retorna el texto y si fue truncado.
+        '''
+        if not max_tokens or estimate_tokens(text) <= max_tokens:
+            return text, False
+
+        # Con un presupuesto menor que la marca, sólo queda la marca
+        max_chars = max(0, max_tokens * 4 - len(TRUNCATION_MARKER))
+        if max_chars == 0:
+            return TRUNCATION_MARKER, True
+
+        head_chars = int(max_chars * self.head_ratio)
+        tail_chars = max_chars - head_chars
+
+        return text[:head_chars] + TRUNCATION_MARKER + (text[-tail_chars:] if tail_chars > 0 else ""), True
+
+
+    def get_stats(self) -> dict:
+        '''
+        Método que entrega las estadísticas de la ejecución por campo, incluyendo tokens ahorrados
+        '''
+        with self._lock:
+            return {
+                field: {**stats, "tokens_saved": stats["tokens_before"] - stats["tokens_after"]}
+                for field, stats in self.stats.items()
+            }
+
+
+    def print_stats(self) -> None:
+        '''
+        Método que informa los tokens ahorrados por el preprocesamiento
+        '''
+        for field, stats in self.get_stats().items():
+            if stats["texts"]:
+                logger.info(
+                    "Preprocesamiento de %s: %s textos, %s -> %s tokens estimados (%s ahorrados, %s truncados)",
+                    field, stats["texts"], stats["tokens_before"], stats["tokens_after"],
+                    stats["tokens_saved"], stats["truncated"]
+                )